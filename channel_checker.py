@@ -5,12 +5,15 @@ __author__ = 'td.junopark'
 
 import os
 import time
-import pprint
 import traceback
 # import DeadlineNukeClient
 
 import nuke
 
+from sciprt import logic
+from sciprt import backends
+from sciprt import output
+
 try:
     from PySide6.QtWidgets import (
         QApplication, QDialog, QVBoxLayout, QHBoxLayout, QGridLayout,
@@ -52,6 +55,8 @@ class ChannelChecker(QDialog):
         self.table_menu = None
         self.files = []
         self.channels = []
+        self.layer_ranges = {}
+        self.layer_ranges_step = 1
         
     def set_widgets(self):
         self.setWindowTitle('Channel Checker v' + __version__)
@@ -67,7 +72,7 @@ class ChannelChecker(QDialog):
         self.main_lb.setFont(QFont('Arial', 20, QFont.Weight.Bold))
         self.main_lb.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
 
-        self.headers = ['Render', 'Channel', 'Data Exists']
+        self.headers = ['Render', 'Channel', 'Data Exists', 'Active Frames']
         self.table_widget = QTableWidget()
         self.table_widget.setColumnCount(len(self.headers))
         self.table_widget.setHorizontalHeaderLabels(self.headers)
@@ -79,7 +84,9 @@ class ChannelChecker(QDialog):
         self.table_widget.horizontalHeader().setSectionResizeMode(self.headers.index('Channel'), QHeaderView.ResizeMode.Stretch)
         self.table_widget.horizontalHeader().setSectionResizeMode(self.headers.index('Data Exists'), QHeaderView.ResizeMode.Fixed)
         self.table_widget.setColumnWidth(self.headers.index('Render'), 60)
+        self.table_widget.horizontalHeader().setSectionResizeMode(self.headers.index('Active Frames'), QHeaderView.ResizeMode.Fixed)
         self.table_widget.setColumnWidth(self.headers.index('Data Exists'), 100)
+        self.table_widget.setColumnWidth(self.headers.index('Active Frames'), 150)
         
         self.h_spacer_1 = QSpacerItem(20, 20, QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum)
         self.h_spacer_2 = QSpacerItem(20, 20, QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum)
@@ -87,6 +94,7 @@ class ChannelChecker(QDialog):
         self.h_spacer_4 = QSpacerItem(20, 20, QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum)
         self.h_spacer_5 = QSpacerItem(20, 20, QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum)
         self.h_spacer_6 = QSpacerItem(20, 20, QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum)
+        self.h_spacer_7 = QSpacerItem(20, 20, QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum)
         
         self.selected_node_lb = QLabel('Selected Node:')
         self.selected_node_lb.setFont(QFont('Arial', 10, QFont.Weight.Bold))
@@ -116,6 +124,13 @@ class ChannelChecker(QDialog):
         self.sequence_ext_cmbx = QComboBox()
         self.sequence_ext_cmbx.addItems(['.exr'])
         
+        self.backend_lb = QLabel('Backend')
+        self.backend_lb.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        self.backend_cmbx = QComboBox()
+        self.backend_cmbx.addItems(['Auto'] + backends.backend_names())
+        
+        self.active_ranges_ckbx = QCheckBox('Find active frame ranges (limits denoising to frames with data)')
+        
         self.folder_prefix_lb = QLabel(' Folder Prefix')
         self.folder_prefix_lb.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
         self.folder_prefix_le = QLineEdit('OIDN')
@@ -127,6 +142,12 @@ class ChannelChecker(QDialog):
         self.run_submitter_cmbx = QComboBox()
         self.run_submitter_cmbx.addItems(['Nothing', 'Submit'])
         
+        self.split_outputs_ckbx = QCheckBox('Split data passes into a separate output (OIDN_<folder>_data)')
+        self.split_outputs_ckbx.setToolTip(
+            'Data passes (depth, P, motion, crypto, ...) are written losslessly to a second sequence,\n'
+            'and the main output keeps only the remaining layers.'
+            )
+        
         self.export_log_lb = QLabel('       Log Path')
         self.export_log_lb.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
         self.export_log_le = QLineEdit()
@@ -156,12 +177,19 @@ class ChannelChecker(QDialog):
         sequence_ext_layout.addWidget(self.sequence_ext_cmbx)
         sequence_ext_layout.addItem(self.h_spacer_3)
         
+        backend_layout = QHBoxLayout()
+        backend_layout.addWidget(self.backend_cmbx)
+        backend_layout.addItem(self.h_spacer_7)
+        
         analyze_group_layout.addWidget(self.target_lb, 0, 0)
         analyze_group_layout.addWidget(self.target_le, 0, 1)
         analyze_group_layout.addWidget(self.frame_step_lb, 1, 0)
         analyze_group_layout.addLayout(frame_step_layout, 1, 1)
         analyze_group_layout.addWidget(self.sequence_ext_lb, 2, 0)
         analyze_group_layout.addLayout(sequence_ext_layout, 2, 1)
+        analyze_group_layout.addWidget(self.backend_lb, 3, 0)
+        analyze_group_layout.addLayout(backend_layout, 3, 1)
+        analyze_group_layout.addWidget(self.active_ranges_ckbx, 4, 1)
         
         render_group = QGroupBox('Node Settings')
         render_group_layout = QGridLayout()
@@ -179,6 +207,7 @@ class ChannelChecker(QDialog):
         render_group_layout.addLayout(folder_prefix_layout, 0, 1)
         render_group_layout.addWidget(self.run_submitter_lb, 1, 0)
         render_group_layout.addLayout(submitter_layout, 1, 1)
+        render_group_layout.addWidget(self.split_outputs_ckbx, 2, 1)
     
         self.log_group = QGroupBox('Export Log')
         self.log_group.setCheckable(True)
@@ -220,7 +249,7 @@ class ChannelChecker(QDialog):
         node = nuke.selectedNode()
         file_path = node['file'].value()
         directory_path = os.path.dirname(file_path)
-        self.files = sorted([f for f in os.listdir(directory_path) if f.endswith(self.sequence_ext_cmbx.currentText())])
+        self.files = logic.list_sequence_files(directory_path, self.sequence_ext_cmbx.currentText())
         first_frame_path = os.path.join(directory_path, self.files[0]).replace(os.sep, '/')
         self.channels = []
         
@@ -269,22 +298,16 @@ class ChannelChecker(QDialog):
             exists_item.setFlags(exists_item.flags() ^ Qt.ItemFlag.ItemIsEditable)
             exists_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
             self.table_widget.setItem(i, self.headers.index('Data Exists'), exists_item)
+            
+            # Set Active Frames
+            frames_item = QTableWidgetItem('N/A')
+            frames_item.setFlags(frames_item.flags() ^ Qt.ItemFlag.ItemIsEditable)
+            frames_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.table_widget.setItem(i, self.headers.index('Active Frames'), frames_item)
         
     def get_image_channels(self, file_path):
         try:
-            read = nuke.createNode("Read", inpanel=False)
-            read['file'].fromUserText(file_path)
-            channels = read.channels()
-
-            # TODO: Add filtering options if needed
-            channels_filter = ['N.', 'albedo.', 'normal.']
-
-            filtered_channels = [
-                ch for ch in channels
-                if not any(ch.startswith(excluded) for excluded in channels_filter)
-            ]
-            nuke.delete(read)
-            return list(filtered_channels)
+            return logic.get_exr_channels(file_path, self._selected_backend())
         except Exception as e:
             print(traceback.format_exc())
             QMessageBox.warning(self, 'Warning', 'Error retrieving channels from EXR file.')
@@ -327,8 +350,9 @@ class ChannelChecker(QDialog):
         
         os.makedirs(os.path.dirname(log_path), exist_ok=True)
         
+        report = {}
         try:
-            valid_channels, empty_channels, channel_first_seen = self.analyze_sequence()
+            valid_channels, empty_channels, channel_first_seen = self.analyze_sequence(report)
         except Exception as e:
             print(traceback.format_exc())
             QMessageBox.warning(self, 'Warning', 'An error occurred during analysis.')
@@ -338,6 +362,14 @@ class ChannelChecker(QDialog):
             QMessageBox.warning(self, 'Warning', 'No analysis results found.')
             return
         
+        try:
+            logic.record_in_index(
+                directory_path, self.files, (valid_channels, empty_channels, channel_first_seen), frame_step, report,
+                layer_ranges=self.layer_ranges
+                )
+        except Exception as e:
+            print(traceback.format_exc())
+        
         for row in range(self.table_widget.rowCount()):
             channel = self.table_widget.item(row, self.headers.index('Channel')).text()
             render = self.table_widget.cellWidget(row, self.headers.index('Render'))
@@ -352,17 +384,20 @@ class ChannelChecker(QDialog):
             item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
             item.setFlags(item.flags() ^ Qt.ItemFlag.ItemIsEditable)
             self.table_widget.setItem(row, self.headers.index('Data Exists'), item)
+            
+            frames_item = QTableWidgetItem(
+                (logic.format_ranges(self.layer_ranges.get(channel, [])) or '-') if self.layer_ranges else 'N/A'
+                )
+            frames_item.setToolTip(frames_item.text())
+            frames_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            frames_item.setFlags(frames_item.flags() ^ Qt.ItemFlag.ItemIsEditable)
+            self.table_widget.setItem(row, self.headers.index('Active Frames'), frames_item)
         
         if self.log_group.isChecked():
-            with open(log_path, 'w') as f:
-                f.write("[Empty Channels Analysis]\n")
-                f.write(f"  - Directory: {directory_path}\n")
-                f.write(f"  - Frame Step: {frame_step}\n")
-                f.write(f"  - Elapsed Time: {time.time() - start_time:.2f} seconds\n\n")
-                f.write(f"[Valid Channels]: {valid_channels}\n\n")
-                f.write(f"[Empty Channels]: {empty_channels}\n\n")
-                f.write("[Valid Channels Data]\n")
-                f.write(pprint.pformat(channel_first_seen))
+            logic.write_log(
+                log_path, directory_path, frame_step, time.time() - start_time,
+                (valid_channels, empty_channels, channel_first_seen), report, self.layer_ranges
+                )
 
             QMessageBox.information(self, 'Information', 'Analysis and log creation completed.')
             self.setup_btn.setEnabled(True)
@@ -379,8 +414,20 @@ class ChannelChecker(QDialog):
                 unchecked_rows.append(row)
         return unchecked_rows
     
+    def _get_checked_channels(self):
+        unchecked_rows = self._get_unchecked_rows()
+        return [
+            self.table_widget.item(row, self.headers.index('Channel')).text()
+            for row in range(self.table_widget.rowCount()) if row not in unchecked_rows
+        ]
+    
     def setup_handler(self):
         unchecked_rows = self._get_unchecked_rows()
+        checked_channels = self._get_checked_channels()
+        if not checked_channels:
+            QMessageBox.warning(self, 'Warning', 'No channels are checked.')
+            return
+        
         nk_template_path = os.path.join(os.path.dirname(__file__), 'OIDN_Converter.nk')
         if not os.path.exists(nk_template_path):
             QMessageBox.warning(self, 'Warning', 'Template file not found.')
@@ -397,13 +444,6 @@ class ChannelChecker(QDialog):
         nk_template['xpos'].setValue(read_node['xpos'].value())
         nk_template['ypos'].setValue(read_node['ypos'].value() + 100)
         
-        write_node = nuke.createNode('Write')
-        write_node.setInput(0, nk_template)
-        write_node['channels'].setValue('all')
-        write_node['colorspace'].setValue('ACES - ACEScg')
-        write_node['xpos'].setValue(nk_template['xpos'].value())
-        write_node['ypos'].setValue(nk_template['ypos'].value() + 50)
-        
         target_path = self.target_le.text()
         basename = os.path.basename(target_path)
         folder_path = '/'.join(target_path.split('/')[0:-1])
@@ -411,31 +451,123 @@ class ChannelChecker(QDialog):
         
         origin_basename = origin_basename.replace(basename, f"{self.folder_prefix_le.text()}_{basename}")
         
-        write_node['file'].setValue(os.path.join(folder_path, origin_basename).replace(os.sep, '/'))
-        
-        os.makedirs(folder_path, exist_ok=True)
-        
         if unchecked_rows:
             self.disable_shuffles(nk_template, unchecked_rows)
-            
-        write_node.setSelected(True)
+        
+        range_message = ''
+        if self.layer_ranges:
+            range_message = self.limit_denoise_ranges(nk_template, checked_channels)
+        
+        oidn_layers = {
+            channel: shuffle_node['out2'].value()
+            for channel, shuffle_node in self._get_oidn_shuffles(nk_template).items()
+        }
+        denoised_layers = {channel: layer for channel, layer in oidn_layers.items() if channel in checked_channels}
+        
+        # Only unchecked rows and their denoised layers are removed. Layers the table
+        # does not show (e.g. CHANNEL_FILTER) were never analyzed and stay in the output.
+        unchecked_channels = [
+            self.table_widget.item(row, self.headers.index('Channel')).text() for row in unchecked_rows
+            ]
+        remove_layers = unchecked_channels + [oidn_layers[ch] for ch in unchecked_channels if ch in oidn_layers]
+        
+        # Channel counts of everything in the stream, for grouping and size estimates.
+        layer_channels = {}
+        for channel in read_node.channels():
+            layer = channel.split('.')[0]
+            layer_channels[layer] = layer_channels.get(layer, 0) + 1
+        for denoised_layer in denoised_layers.values():
+            layer_channels[denoised_layer] = 4
+        
+        kept_layers = [
+            layer for layer in layer_channels
+            if layer not in remove_layers and layer not in denoised_layers.values()
+            ]
+        groups = output.group_layers(kept_layers, denoised_layers)
+        if not self.split_outputs_ckbx.isChecked():
+            groups = output.merge_groups(groups)
+        
+        # The group holding the beauty keeps the plain output folder, others get a suffix.
+        primary_group = next((g for g, (_, layers) in groups.items() if 'rgba' in layers), next(iter(groups)))
+        write_nodes = []
+        for i, (group, (compression, layers)) in enumerate(groups.items()):
+            group_folder = folder_path if group == primary_group else f"{folder_path}_{group}"
+            # Each Write also drops the layers that other groups write.
+            other_layers = [layer for layer in layer_channels if layer not in layers and layer not in remove_layers]
+            write_node = self.create_write(nk_template, remove_layers + other_layers, compression, i)
+            write_node['file'].setValue(os.path.join(group_folder, origin_basename).replace(os.sep, '/'))
+            os.makedirs(group_folder, exist_ok=True)
+            write_nodes.append(write_node)
+        
+        for write_node in write_nodes:
+            write_node.setSelected(True)
+        
+        estimate = output.estimate_output_size(
+            layer_channels,
+            list(layer_channels),
+            groups,
+            read_node.width() * read_node.height(),
+            len(self.files),
+            )
+        size_message = (
+            f"Removed layers: {output.format_size(estimate['removed'])} of "
+            f"{output.format_size(estimate['before'])} uncompressed ({estimate['ratio'] * 100:.0f}% less data)\n"
+            f"Compression (rough estimate): ~{output.format_size(estimate['compressed'])} "
+            f"instead of ~{output.format_size(estimate['compressed_baseline'])} at {output.BASELINE_COMPRESSION}"
+            )
+        if len(write_nodes) > 1:
+            size_message += f"\nOutputs split into: {', '.join(node['file'].value() for node in write_nodes)}"
+        print(size_message)
+        if range_message:
+            print(range_message)
+            size_message += f"\n\n{range_message}"
         
         if self.run_submitter_cmbx.currentText() == 'Submit':
             # TODO: Integrate DeadlineNukeClient if available
             # DeadlineNukeClient.main()
             pass
         else:
-            QMessageBox.information(self, 'Information', '노드 설정이 완료되었습니다.')
-        
-    def disable_shuffles(self, nk_template, unchecked_rows):
-        shuffle_nodes = {}
+            QMessageBox.information(self, 'Information', f'노드 설정이 완료되었습니다.\n\n{size_message}')
+    
+    def create_write(self, nk_template, remove_layers, compression, column):
+        xpos = nk_template['xpos'].value() + column * 150
+        ypos = nk_template['ypos'].value() + 50
+        input_node = nk_template
+        
+        # Remove takes up to four layers per node.
+        for i in range(0, len(remove_layers), 4):
+            remove_node = nuke.createNode('Remove', inpanel=False)
+            remove_node.setInput(0, input_node)
+            remove_node['operation'].setValue('remove')
+            for knob_name, layer in zip(['channels', 'channels2', 'channels3', 'channels4'], remove_layers[i:i + 4]):
+                remove_node[knob_name].setValue(layer)
+            remove_node['xpos'].setValue(xpos)
+            remove_node['ypos'].setValue(ypos)
+            ypos += 30
+            input_node = remove_node
+        
+        write_node = nuke.createNode('Write', inpanel=False)
+        write_node.setInput(0, input_node)
+        write_node['file_type'].setValue('exr')
+        write_node['channels'].setValue('all')
+        write_node['colorspace'].setValue('ACES - ACEScg')
+        nuke_compression = output.nuke_compression(write_node['compression'].values(), compression)
+        if nuke_compression:
+            write_node['compression'].setValue(nuke_compression)
+        write_node['xpos'].setValue(xpos)
+        write_node['ypos'].setValue(ypos + 20)
+        return write_node
+    
+    def _get_template_nodes(self, nk_template):
         nk_template.begin()
         try:
-            all_nodes = nuke.allNodes()
+            return nuke.allNodes()
         finally:
             nk_template.end()
-            
-        for node in all_nodes:
+    
+    def _get_oidn_shuffles(self, nk_template):
+        shuffle_nodes = {}
+        for node in self._get_template_nodes(nk_template):
             if not node.Class() == 'Shuffle2':
                 continue
             
@@ -445,7 +577,10 @@ class ChannelChecker(QDialog):
             
             label_split = label.split('\n')[-1]
             shuffle_nodes[label_split] = node
-            
+        return shuffle_nodes
+    
+    def disable_shuffles(self, nk_template, unchecked_rows):
+        shuffle_nodes = self._get_oidn_shuffles(nk_template)
         for row in unchecked_rows:
             channel = self.table_widget.item(row, self.headers.index('Channel')).text()
             shuffle_node = shuffle_nodes.get(channel)
@@ -454,38 +589,55 @@ class ChannelChecker(QDialog):
             
             shuffle_node['disable'].setValue(True)
                 
-    def validate_exr_channels(self, node, frame_number, target_channels):
-        empty_channels = []
-        valid_channels = []
-
-        shuffle = nuke.createNode('Shuffle', inpanel=False)
-        shuffle['xpos'].setValue(0)
-        shuffle['ypos'].setValue(50)
-        shuffle.setInput(0, node)
-        curve_tool = nuke.createNode('CurveTool', inpanel=False)
-        curve_tool['xpos'].setValue(0)
-        curve_tool['ypos'].setValue(100)
-        w, h = curve_tool.width(), curve_tool.height()
-
-        for channel in target_channels:
-            shuffle['in'].setValue(channel)
-            curve_tool['operation'].setValue('Max Luma Pixel')
-            curve_tool['ROI'].setValue((0, 0, w, h))
-            nuke.execute(curve_tool, frame_number, frame_number)
-            max_data = curve_tool['maxlumapixvalue'].value()
-            min_data = curve_tool['minlumapixvalue'].value()
-            max_val = max(max_data)
-            min_val = max(min_data)
-
-            if max_val == 0 and min_val == 0:
-                empty_channels.append(channel)
-            else:
-                valid_channels.append(channel)
-
-        nuke.delete(curve_tool)
-        nuke.delete(shuffle)
-
-        return valid_channels, empty_channels
+    def limit_denoise_ranges(self, nk_template, checked_channels):
+        frame_numbers = [logic.extract_frame_number(f) for f in self.files]
+        frame_numbers = [n for n in frame_numbers if n is not None]
+        full_range = [(min(frame_numbers), max(frame_numbers))] if frame_numbers else []
+        
+        limited = []
+        not_limited = []
+        denoise_nodes = self._get_denoise_nodes(nk_template)
+        for channel in checked_channels:
+            intervals = self.layer_ranges.get(channel)
+            if not intervals or intervals == full_range:
+                continue
+            denoise_node = denoise_nodes.get(channel)
+            if not denoise_node:
+                not_limited.append(channel)
+                continue
+            
+            # Outside its active frames the denoiser passes the (empty) layer through.
+            active = ' || '.join(f"(frame >= {first} && frame <= {last})" for first, last in intervals)
+            denoise_node['disable'].setExpression(f"!({active})")
+            denoise_node['label'].setValue(f"active: {logic.format_ranges(intervals)}")
+            limited.append(f"{channel} ({logic.format_ranges(intervals)})")
+        
+        messages = []
+        if limited:
+            messages.append(f"Denoising limited to active frames: {', '.join(limited)}")
+        if not_limited:
+            messages.append(f"No oidnDenoise node to limit, denoised on every frame: {', '.join(not_limited)}")
+        if limited and self.layer_ranges_step > 1:
+            messages.append(
+                f"Warning: ranges were found with a frame step of {self.layer_ranges_step}. A layer that is active "
+                f"for fewer frames than that between two empty samples was missed and will not be denoised."
+                )
+        return '\n'.join(messages)
+            
+    def _get_denoise_nodes(self, nk_template):
+        # OUT_ shuffles write the same OIDN_ layer as the matching OIDN shuffle and sit right below the denoiser.
+        out_shuffles = {}
+        for node in self._get_template_nodes(nk_template):
+            if node.Class() == 'Shuffle2' and node['label'].value().startswith('OUT'):
+                out_shuffles[node['out1'].value()] = node
+        
+        denoise_nodes = {}
+        for channel, shuffle_node in self._get_oidn_shuffles(nk_template).items():
+            out_shuffle = out_shuffles.get(shuffle_node['out2'].value())
+            upstream = out_shuffle.input(0) if out_shuffle else None
+            if upstream and upstream.Class() == 'oidnDenoise':
+                denoise_nodes[channel] = upstream
+        return denoise_nodes
     
     def browse_log_path(self):
         default_path = os.path.dirname(self.export_log_le.text()) if self.export_log_le.text() else os.path.expanduser("~")
@@ -493,47 +645,32 @@ class ChannelChecker(QDialog):
         if log_path:
             self.export_log_le.setText(log_path)
 
-    def analyze_sequence(self):
-        directory_path = self.target_le.text()
-        frame_step = self.frame_step_sb.value()
-        
-        initial_channels = self.channels
+    def _selected_backend(self):
+        backend = self.backend_cmbx.currentText()
+        return None if backend == 'Auto' else backend
 
-        remaining_channels = initial_channels[:]
-        channel_status = {ch: True for ch in initial_channels}
-        channel_first_seen = {}
+    def analyze_sequence(self, report=None):
+        self.layer_ranges = {}
+        self.layer_ranges_step = self.frame_step_sb.value()
+        if not self.active_ranges_ckbx.isChecked():
+            return logic.analyze_sequence(
+                self.target_le.text(),
+                self.frame_step_sb.value(),
+                files=self.files,
+                layers=self.channels,
+                backend=self._selected_backend(),
+                report=report,
+                )
         
-        for i, file_name in enumerate(self.files):
-            if not i % frame_step == 0:
-                continue
-
-            frame_path = os.path.join(directory_path, file_name).replace(os.sep, '/')
-            if not os.path.exists(frame_path):
-                print(f"File not found: {frame_path}")
-                continue
-
-            node = nuke.createNode("Read", f"file {{{frame_path}}}", inpanel=False)
-            node['xpos'].setValue(0)
-            node['ypos'].setValue(0)
-            frame_number = int(os.path.splitext(file_name)[0][-4:])
-
-            valid_channels, empty_channels = self.validate_exr_channels(node, frame_number, remaining_channels)
-
-            for ch in valid_channels:
-                if ch not in channel_first_seen:
-                    channel_first_seen[ch] = frame_number
-            for ch in valid_channels:
-                channel_status[ch] = False
-
-            remaining_channels = [ch for ch in remaining_channels if channel_status[ch]]
-            nuke.delete(node)
-
-            if not remaining_channels:
-                break
-            
-        empty_channels = [ch for ch, is_empty in channel_status.items() if is_empty]
-        valid_channels = [ch for ch, is_empty in channel_status.items() if not is_empty]
-
+        valid_channels, empty_channels, self.layer_ranges = logic.analyze_active_ranges(
+            self.target_le.text(),
+            self.frame_step_sb.value(),
+            files=self.files,
+            layers=self.channels,
+            backend=self._selected_backend(),
+            report=report,
+            )
+        channel_first_seen = {ch: intervals[0][0] for ch, intervals in self.layer_ranges.items()}
         return valid_channels, empty_channels, channel_first_seen
             
     def check_selected(self):
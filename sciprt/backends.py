@@ -0,0 +1,468 @@
+# -*- coding: utf-8 -*-
+
+
+import os
+import array
+import struct
+import time
+try:
+    import nuke
+except ImportError:
+    nuke = None
+try:
+    import OpenEXR
+    import Imath
+except ImportError:
+    OpenEXR = None
+
+
+# TODO: Add filtering options if needed
+CHANNEL_FILTER = ['N.', 'albedo.', 'normal.']
+
+EXR_MAGIC = b'\x76\x2f\x31\x01'
+EXR_COMPRESSION = ['NONE', 'RLE', 'ZIPS', 'ZIP', 'PIZ', 'PXR24', 'B44', 'B44A', 'DWAA', 'DWAB']
+EXR_PIXEL_TYPES = ['UINT', 'HALF', 'FLOAT']
+
+# Shuffle slot of a channel by its lower-case suffix; other channels fill the free slots in order.
+SHUFFLE_SLOTS = {'r': 0, 'red': 0, 'g': 1, 'green': 1, 'b': 2, 'blue': 2, 'a': 3, 'alpha': 3}
+
+# Rec. 709 weights of Nuke's luminance, as used by CurveTool's Max Luma Pixel.
+LUMA_WEIGHTS = (0.2125, 0.7154, 0.0721)
+
+# Bare EXR channel names as Nuke exposes them.
+BARE_CHANNEL_LAYERS = {
+    'R': 'rgba.red',
+    'G': 'rgba.green',
+    'B': 'rgba.blue',
+    'A': 'rgba.alpha',
+    'Z': 'depth.Z',
+}
+
+_BACKENDS = {}
+
+
+def read_exr_header(file_path: str) -> dict:
+    """
+    Read the header of an EXR file without decoding any pixels.
+
+    The top level keys describe the first part; every part is listed under 'parts'.
+
+    Args:
+        file_path (str): The path to the EXR file.
+
+    Returns:
+        dict: Header information with keys 'channels' (list of (name, pixel type) tuples),
+            'compression', 'layout', 'data_window', 'parts', 'header_size' and 'file_size'.
+    """
+    with open(file_path, 'rb') as f:
+        if f.read(4) != EXR_MAGIC:
+            raise ValueError(f"Not an EXR file: {file_path}")
+        flags = struct.unpack('<i', f.read(4))[0]
+
+        if flags & 0x1000:
+            layout = 'multipart'
+        elif flags & 0x800:
+            layout = 'deep'
+        elif flags & 0x200:
+            layout = 'tiled'
+        else:
+            layout = 'scanline'
+
+        parts = []
+        while True:
+            part = _read_part_header(f)
+            if part is None:
+                break
+            parts.append(part)
+            # Single-part files have no empty header to end the list.
+            if layout != 'multipart':
+                break
+        if not parts:
+            raise ValueError(f"EXR file has no header: {file_path}")
+
+        header = dict(parts[0])
+        if layout != 'multipart' and header['type'].startswith('deep'):
+            layout = 'deep'
+        header['layout'] = layout
+        header['parts'] = parts
+        header['header_size'] = f.tell()
+    header['file_size'] = os.path.getsize(file_path)
+    return header
+
+
+def _read_part_header(f) -> dict:
+    part = {
+        'name': None,
+        'type': '',
+        'channels': [],
+        'compression': 'NONE',
+        'data_window': None,
+        'tiles': None,
+        'chunk_count': None,
+    }
+    attr_count = 0
+    while True:
+        attr_name = _read_null_terminated(f)
+        if not attr_name:
+            break
+        attr_count += 1
+        attr_type = _read_null_terminated(f)
+        size = struct.unpack('<i', f.read(4))[0]
+        value = f.read(size)
+
+        if attr_type == 'chlist':
+            part['channels'] = _parse_chlist(value)
+        elif attr_type == 'compression':
+            part['compression'] = EXR_COMPRESSION[value[0]]
+        elif attr_name == 'dataWindow':
+            part['data_window'] = struct.unpack('<4i', value)
+        elif attr_name == 'tiles':
+            part['tiles'] = struct.unpack('<2I', value[:8])
+        elif attr_name == 'name':
+            part['name'] = value.decode('utf-8', 'replace')
+        elif attr_name == 'type':
+            part['type'] = value.decode('utf-8', 'replace')
+        elif attr_name == 'chunkCount':
+            part['chunk_count'] = struct.unpack('<i', value)[0]
+    return part if attr_count else None
+
+
+def _read_null_terminated(f) -> str:
+    chars = bytearray()
+    while True:
+        char = f.read(1)
+        if not char or char == b'\x00':
+            break
+        chars += char
+    return chars.decode('utf-8', 'replace')
+
+
+def _parse_chlist(value: bytes) -> list:
+    channels = []
+    pos = 0
+    while pos < len(value) and value[pos] != 0:
+        end = value.index(b'\x00', pos)
+        name = value[pos:end].decode('utf-8', 'replace')
+        pixel_type = struct.unpack('<i', value[end + 1:end + 5])[0]
+        channels.append((name, EXR_PIXEL_TYPES[pixel_type]))
+        # pLinear (1) + reserved (3) + xSampling (4) + ySampling (4)
+        pos = end + 1 + 4 + 4 + 8
+    return channels
+
+
+def exr_to_nuke_channel(exr_channel: str) -> str:
+    """
+    Convert a raw EXR channel name to the 'layer.channel' name Nuke shows for it.
+
+    Args:
+        exr_channel (str): The channel name stored in the EXR file.
+
+    Returns:
+        str: The Nuke style channel name.
+    """
+    if exr_channel in BARE_CHANNEL_LAYERS:
+        return BARE_CHANNEL_LAYERS[exr_channel]
+    if '.' not in exr_channel:
+        return f"other.{exr_channel}"
+    layer, _, channel = exr_channel.rpartition('.')
+    return f"{layer.replace('.', '_')}.{channel}"
+
+
+def part_channel_names(header: dict) -> list:
+    """
+    List the channels of every part of an EXR file, with bare names prefixed by their part name.
+
+    Args:
+        header (dict): The header from read_exr_header.
+
+    Returns:
+        list: (part index, EXR channel name) tuples, in part order.
+    """
+    multipart = len(header['parts']) > 1
+    channels = []
+    for part_index, part in enumerate(header['parts']):
+        for name, _ in part['channels']:
+            if multipart and part['name'] and '.' not in name:
+                name = f"{part['name']}.{name}"
+            channels.append((part_index, name))
+    return channels
+
+
+def filter_channels(channels: list) -> list:
+    """
+    Remove channels matching CHANNEL_FILTER.
+
+    Args:
+        channels (list): Nuke style channel names.
+
+    Returns:
+        list: The channels that are not filtered out.
+    """
+    return [
+        ch for ch in channels
+        if not any(ch.startswith(excluded) for excluded in CHANNEL_FILTER)
+    ]
+
+
+def register_backend(backend_cls):
+    """
+    Register an analysis backend class under its name.
+
+    Args:
+        backend_cls (type): A subclass of AnalysisBackend.
+
+    Returns:
+        type: The registered class, so this can be used as a decorator.
+    """
+    _BACKENDS[backend_cls.name] = backend_cls
+    return backend_cls
+
+
+def backend_names() -> list:
+    """
+    Get the names of all registered backends, in registration order.
+
+    Returns:
+        list: Backend names.
+    """
+    return list(_BACKENDS)
+
+
+def get_backend(name: str):
+    """
+    Create a registered backend by name.
+
+    Args:
+        name (str): The backend name.
+
+    Returns:
+        AnalysisBackend: The backend instance.
+    """
+    if name not in _BACKENDS:
+        raise KeyError(f"Unknown analysis backend: {name}")
+    return _BACKENDS[name]()
+
+
+def available_backends(header: dict = None) -> list:
+    """
+    Create every registered backend that can run here and, if given, handle the header.
+
+    Args:
+        header (dict, optional): An EXR header from read_exr_header. Defaults to None.
+
+    Returns:
+        list: Backend instances, in registration order.
+    """
+    backends = []
+    for backend_cls in _BACKENDS.values():
+        backend = backend_cls()
+        if not backend.is_available():
+            continue
+        if header is not None and not backend.can_handle(header):
+            continue
+        backends.append(backend)
+    return backends
+
+
+class AnalysisBackend(object):
+    """
+    Base class for the engines that list and validate EXR layers.
+
+    Subclasses set a unique name and are added with register_backend.
+    """
+    name = ''
+
+    def is_available(self) -> bool:
+        """Whether the backend can run in the current interpreter."""
+        return True
+
+    def can_handle(self, header: dict) -> bool:
+        """Whether the backend can decode a file with the given header."""
+        return True
+
+    def get_channels(self, file_path: str) -> list:
+        """Get the Nuke style channel names of a frame."""
+        raise NotImplementedError
+
+    def validate_layers(self, file_path: str, frame_number: int, target_layers: list) -> tuple:
+        """Split target layers into (valid layers, empty layers) for one frame."""
+        raise NotImplementedError
+
+
+@register_backend
+class NukeBackend(AnalysisBackend):
+    """
+    Evaluate layers through a Read -> Shuffle -> CurveTool graph.
+    """
+    name = 'nuke'
+
+    def is_available(self) -> bool:
+        return nuke is not None and hasattr(nuke, 'createNode')
+
+    def get_channels(self, file_path: str) -> list:
+        read = nuke.createNode("Read", inpanel=False)
+        try:
+            read['file'].fromUserText(file_path)
+            return filter_channels(read.channels())
+        finally:
+            nuke.delete(read)
+
+    def validate_layers(self, file_path: str, frame_number: int, target_layers: list) -> tuple:
+        empty_layers = []
+        valid_layers = []
+
+        read = nuke.createNode("Read", f"file {{{file_path}}}", inpanel=False)
+        read['xpos'].setValue(0)
+        read['ypos'].setValue(0)
+        shuffle = nuke.createNode('Shuffle', inpanel=False)
+        shuffle['xpos'].setValue(0)
+        shuffle['ypos'].setValue(50)
+        shuffle.setInput(0, read)
+        curve_tool = nuke.createNode('CurveTool', inpanel=False)
+        curve_tool['xpos'].setValue(0)
+        curve_tool['ypos'].setValue(100)
+        w, h = curve_tool.width(), curve_tool.height()
+
+        try:
+            for layer in target_layers:
+                shuffle['in'].setValue(layer)
+                curve_tool['operation'].setValue('Max Luma Pixel')
+                curve_tool['ROI'].setValue((0, 0, w, h))
+                nuke.execute(curve_tool, frame_number, frame_number)
+                max_data = curve_tool['maxlumapixvalue'].value()
+                min_data = curve_tool['minlumapixvalue'].value()
+                max_val = max(max_data)
+                min_val = max(min_data)
+
+                if max_val == 0 and min_val == 0:
+                    empty_layers.append(layer)
+                else:
+                    valid_layers.append(layer)
+        finally:
+            nuke.delete(curve_tool)
+            nuke.delete(shuffle)
+            nuke.delete(read)
+
+        return valid_layers, empty_layers
+
+
+@register_backend
+class OpenEXRBackend(AnalysisBackend):
+    """
+    Decode frames directly with the OpenEXR bindings and test the channel values.
+
+    Follows the Nuke graph: only the channels a Shuffle would put into red, green
+    and blue are read, and a layer is empty when their luminance is 0.0 on every
+    pixel of the display window. Luminance that cancels out to 0.0 from non-zero
+    channels still differs from CurveTool, which reports the pixel values.
+    """
+    name = 'openexr'
+
+    def is_available(self) -> bool:
+        return OpenEXR is not None
+
+    def can_handle(self, header: dict) -> bool:
+        # InputFile only reads the first part and has no deep support.
+        return header.get('layout') in ('scanline', 'tiled')
+
+    def get_channels(self, file_path: str) -> list:
+        header = read_exr_header(file_path)
+        channels = []
+        for _, name in part_channel_names(header):
+            channel = exr_to_nuke_channel(name)
+            if channel not in channels:
+                channels.append(channel)
+        return filter_channels(channels)
+
+    def validate_layers(self, file_path: str, frame_number: int, target_layers: list) -> tuple:
+        exr_file = OpenEXR.InputFile(file_path)
+        try:
+            header = exr_file.header()
+            exr_channels = header['channels']
+            layer_channels = {layer: [] for layer in target_layers}
+            for name in exr_channels:
+                layer = exr_to_nuke_channel(name).split('.')[0]
+                if layer in layer_channels:
+                    layer_channels[layer].append(name)
+            layer_channels = {layer: _shuffle_rgb(names) for layer, names in layer_channels.items()}
+
+            names = [name for layer in target_layers for name in layer_channels[layer] if name]
+            float_type = Imath.PixelType(Imath.PixelType.FLOAT)
+            buffers = {name: array.array('f', exr_file.channel(name, float_type)) for name in names}
+        finally:
+            exr_file.close()
+
+        rows = _display_rows(header['dataWindow'], header['displayWindow'])
+        valid_layers = []
+        empty_layers = []
+        for layer in target_layers:
+            if any(_has_luma([buffers.get(name) for name in layer_channels[layer]], start, end) for start, end in rows):
+                valid_layers.append(layer)
+            else:
+                empty_layers.append(layer)
+        return valid_layers, empty_layers
+
+
+def _shuffle_rgb(names: list) -> list:
+    """
+    Get the channels a Shuffle puts into red, green and blue, None for a slot left black.
+    """
+    slots = [None] * 4
+    others = []
+    for name in names:
+        slot = SHUFFLE_SLOTS.get(name.rpartition('.')[2].lower())
+        if slot is not None and slots[slot] is None:
+            slots[slot] = name
+        else:
+            others.append(name)
+    for name in others:
+        if None not in slots:
+            break
+        slots[slots.index(None)] = name
+    return slots[:3]
+
+
+def _has_luma(buffers: list, start: int, end: int) -> bool:
+    weighted = [(weight, buffer) for weight, buffer in zip(LUMA_WEIGHTS, buffers) if buffer is not None]
+    if not weighted:
+        return False
+    if len(weighted) == 1:
+        # -0.0 == 0.0, so negative zero counts as empty just like in Nuke.
+        return any(weighted[0][1][start:end])
+    columns = [buffer[start:end] for _, buffer in weighted]
+    weights = [weight for weight, _ in weighted]
+    return any(sum(w * v for w, v in zip(weights, values)) for values in zip(*columns))
+
+
+def _display_rows(data_window, display_window) -> list:
+    """
+    Get the (start, end) buffer slices of the data window rows that lie inside the display window.
+    """
+    width = data_window.max.x - data_window.min.x + 1
+    x0 = max(data_window.min.x, display_window.min.x) - data_window.min.x
+    x1 = min(data_window.max.x, display_window.max.x) - data_window.min.x + 1
+    y0 = max(data_window.min.y, display_window.min.y) - data_window.min.y
+    y1 = min(data_window.max.y, display_window.max.y) - data_window.min.y + 1
+    if x0 >= x1 or y0 >= y1:
+        return []
+    if x0 == 0 and x1 == width:
+        return [(y0 * width, y1 * width)]
+    return [(y * width + x0, y * width + x1) for y in range(y0, y1)]
+
+
+def time_backend(backend: AnalysisBackend, file_path: str, frame_number: int, target_layers: list) -> tuple:
+    """
+    Validate one frame with a backend and measure how long it took.
+
+    Args:
+        backend (AnalysisBackend): The backend to run.
+        file_path (str): The path to the frame.
+        frame_number (int): The frame number to evaluate.
+        target_layers (list): List of target layers to validate.
+
+    Returns:
+        tuple: The elapsed seconds and the (valid layers, empty layers) result.
+    """
+    start_time = time.time()
+    result = backend.validate_layers(file_path, frame_number, target_layers)
+    return time.time() - start_time, result
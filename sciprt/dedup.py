@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+
+
+import struct
+import hashlib
+try:
+    from . import backends
+except ImportError:
+    import backends
+
+HASH_SIZE = 16
+
+
+def read_chunk_offsets(f, header: dict) -> list:
+    """
+    Read the chunk offset tables that follow the EXR header.
+
+    The tables of all parts are contiguous and end where the first chunk starts,
+    so no per-layout chunk count is needed.
+
+    Args:
+        f (file): The EXR file opened in binary mode.
+        header (dict): The header from backends.read_exr_header.
+
+    Returns:
+        list: Absolute chunk offsets, in table order.
+    """
+    f.seek(header['header_size'])
+    offsets = []
+    first_chunk = None
+    while first_chunk is None or f.tell() < first_chunk:
+        raw = f.read(8)
+        if len(raw) < 8:
+            raise ValueError("Truncated offset table")
+        offset = struct.unpack('<Q', raw)[0]
+        if offset < f.tell() or offset >= header['file_size']:
+            raise ValueError("Incomplete or corrupt offset table")
+        offsets.append(offset)
+        first_chunk = offset if first_chunk is None else min(first_chunk, offset)
+    return offsets
+
+def part_layers(header: dict) -> dict:
+    """
+    Map each part of an EXR file to the layers whose channels it stores.
+
+    Args:
+        header (dict): The header from backends.read_exr_header.
+
+    Returns:
+        dict: part index -> set of layer names.
+    """
+    layers = {part_index: set() for part_index in range(len(header['parts']))}
+    for part_index, name in backends.part_channel_names(header):
+        layers[part_index].add(backends.exr_to_nuke_channel(name).split('.')[0])
+    return layers
+
+def read_frame_layout(file_path: str) -> tuple:
+    """
+    Read the header and chunk layout of an EXR frame, without touching its pixel data.
+
+    Args:
+        file_path (str): The path to the EXR file.
+
+    Returns:
+        tuple: The header from backends.read_exr_header and a dict of
+            part index -> list of (chunk offset, chunk bytes) in table order.
+    """
+    header = backends.read_exr_header(file_path)
+    with open(file_path, 'rb') as f:
+        offsets = read_chunk_offsets(f, header)
+        ends = dict(zip(sorted(offsets), sorted(offsets)[1:] + [header['file_size']]))
+        chunks = [(offset, ends[offset] - offset) for offset in offsets]
+
+        if header['layout'] != 'multipart':
+            return header, {0: chunks}
+
+        counts = [part['chunk_count'] for part in header['parts']]
+        if None not in counts and sum(counts) == len(chunks):
+            # The offset tables of the parts follow each other in part order.
+            layout = {}
+            for part_index, count in enumerate(counts):
+                layout[part_index], chunks = chunks[:count], chunks[count:]
+            return header, layout
+
+        # Without chunk counts, every multi-part chunk starts with its part number.
+        layout = {}
+        for offset, size in chunks:
+            f.seek(offset)
+            part_index = struct.unpack('<i', f.read(4))[0]
+            layout.setdefault(part_index, []).append((offset, size))
+    return header, layout
+
+def fingerprint_frame(file_path: str, header=None, chunks=None, parts=None) -> dict:
+    """
+    Hash the pixel data of an EXR frame, chunk by chunk.
+
+    The header is left out so frames that only differ in metadata still match.
+
+    Args:
+        file_path (str): The path to the EXR file.
+        header (dict, optional): The frame's header, if already read. Defaults to None.
+        chunks (dict, optional): The frame's chunk layout, if already read. Defaults to None.
+        parts (list, optional): The part indices to hash. Defaults to every part.
+
+    Returns:
+        dict: 'frame' digest (None unless every part was hashed), 'parts' (part index ->
+            digest, for the hashed parts), 'part_bytes' (part index -> chunk bytes, for
+            every part), 'part_layers', 'pixel_bytes', 'size' in bytes and 'path'.
+    """
+    if header is None or chunks is None:
+        header, chunks = read_frame_layout(file_path)
+    parts = sorted(chunks) if parts is None else sorted(parts)
+    part_digests = {}
+
+    with open(file_path, 'rb') as f:
+        for part_index in parts:
+            part_digest = hashlib.blake2b(digest_size=HASH_SIZE)
+            for offset, size in chunks[part_index]:
+                f.seek(offset)
+                part_digest.update(hashlib.blake2b(f.read(size), digest_size=HASH_SIZE).digest())
+            part_digests[part_index] = part_digest.hexdigest()
+
+    frame_digest = None
+    if len(part_digests) == len(chunks):
+        digest = hashlib.blake2b(digest_size=HASH_SIZE)
+        for part_index in sorted(part_digests):
+            digest.update(f"{part_index}:{part_digests[part_index]}".encode('utf-8'))
+        frame_digest = digest.hexdigest()
+
+    part_bytes = {part_index: sum(size for _, size in part_chunks) for part_index, part_chunks in chunks.items()}
+    return {
+        'frame': frame_digest,
+        'parts': part_digests,
+        'part_bytes': part_bytes,
+        'part_layers': part_layers(header),
+        'pixel_bytes': sum(part_bytes.values()),
+        'size': header['file_size'],
+        'path': file_path,
+    }
+
+def _layer_keys(fingerprint: dict, layers: list) -> dict:
+    # A layer's verdict only depends on the parts holding its channels, so it is
+    # keyed by all of them together; a layer split across parts needs every one to match.
+    keys = {}
+    for layer in layers:
+        parts = tuple(
+            (part_index, fingerprint['parts'].get(part_index))
+            for part_index, part_layer_names in sorted(fingerprint['part_layers'].items())
+            if layer in part_layer_names
+        )
+        if parts and all(digest is not None for _, digest in parts):
+            keys[layer] = (layer, parts)
+    return keys
+
+
+class VerdictCache(object):
+    """
+    Remember layer verdicts by content hash so repeated frames and parts are not evaluated again.
+
+    A part is only hashed once an earlier frame had a part with the same index and
+    chunk byte total; until then just the offset table is read, so unique frames
+    and parts are not read twice.
+    """
+
+    def __init__(self):
+        self.frames = {}
+        self.layers = {}
+        self.frames_skipped = 0
+        self.layers_skipped = 0
+        self.bytes_skipped = 0
+        self.bytes_hashed = 0
+        # (part index, chunk bytes) -> (path, verdict) of the one frame with that part not hashed yet.
+        self._unhashed = {}
+        self._hashed_sizes = set()
+
+    def fingerprint(self, file_path: str) -> dict:
+        """
+        Fingerprint a frame, hashing only the parts that could match an earlier frame.
+
+        Args:
+            file_path (str): The path to the EXR file.
+
+        Returns:
+            dict: The fingerprint_frame result.
+        """
+        header, chunks = read_frame_layout(file_path)
+        parts = []
+        earlier_frames = {}
+        for part_index, part_chunks in chunks.items():
+            size_key = (part_index, sum(size for _, size in part_chunks))
+            if size_key in self._unhashed:
+                # A second part of this size: hash the earlier one too so the two can match.
+                earlier_path, earlier_verdict = self._unhashed.pop(size_key)
+                self._hashed_sizes.add(size_key)
+                earlier_frames.setdefault(earlier_path, (earlier_verdict, []))[1].append(part_index)
+            if size_key in self._hashed_sizes:
+                parts.append(part_index)
+
+        # Parts of one earlier frame are hashed together so layers split across them still match.
+        for earlier_path, (earlier_verdict, earlier_parts) in earlier_frames.items():
+            earlier = fingerprint_frame(earlier_path, parts=earlier_parts)
+            self.bytes_hashed += sum(earlier['part_bytes'][part_index] for part_index in earlier_parts)
+            self.store(earlier, earlier_verdict)
+
+        fingerprint = fingerprint_frame(file_path, header, chunks, parts)
+        self.bytes_hashed += sum(fingerprint['part_bytes'][part_index] for part_index in parts)
+        return fingerprint
+
+    def lookup(self, fingerprint: dict, target_layers: list) -> dict:
+        """
+        Get the verdicts already known for a frame's content.
+
+        Args:
+            fingerprint (dict): The frame's fingerprint.
+            target_layers (list): The layers still to validate.
+
+        Returns:
+            dict: layer -> True if valid, False if empty, for the known target layers.
+        """
+        frame_verdict = self.frames.get(fingerprint['frame']) if fingerprint['frame'] else None
+        if frame_verdict is not None and all(layer in frame_verdict for layer in target_layers):
+            self.frames_skipped += 1
+            self.bytes_skipped += fingerprint['pixel_bytes']
+            return {layer: frame_verdict[layer] for layer in target_layers}
+
+        known = {}
+        skipped_parts = set()
+        for layer, key in _layer_keys(fingerprint, target_layers).items():
+            if key in self.layers:
+                known[layer] = self.layers[key]
+                skipped_parts.update(part_index for part_index, _ in key[1])
+        self.bytes_skipped += sum(fingerprint['part_bytes'].get(part_index, 0) for part_index in skipped_parts)
+        self.layers_skipped += len(known)
+        return known
+
+    def store(self, fingerprint: dict, verdict: dict):
+        """
+        Remember the verdicts of a frame under its frame hash and per-layer part hashes.
+
+        Args:
+            fingerprint (dict): The frame's fingerprint.
+            verdict (dict): layer -> True if valid, False if empty.
+        """
+        for part_index, part_bytes in fingerprint['part_bytes'].items():
+            size_key = (part_index, part_bytes)
+            if part_index not in fingerprint['parts'] and size_key not in self._hashed_sizes:
+                self._unhashed.setdefault(size_key, (fingerprint['path'], dict(verdict)))
+        if fingerprint['frame'] is not None:
+            self.frames.setdefault(fingerprint['frame'], {}).update(verdict)
+        for layer, key in _layer_keys(fingerprint, list(verdict)).items():
+            self.layers[key] = verdict[layer]
+
+    def update_report(self, report: dict):
+        report['frames_skipped'] = self.frames_skipped
+        report['layers_skipped'] = self.layers_skipped
+        report['bytes_skipped'] = self.bytes_skipped
+        report['bytes_hashed'] = self.bytes_hashed
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+
+
+import os
+import sys
+import time
+import hashlib
+import sqlite3
+import argparse
+
+INDEX_ENV = 'CHANNEL_CHECKER_INDEX'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sequences (
+    path TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    frame_count INTEGER NOT NULL,
+    first_frame INTEGER,
+    last_frame INTEGER,
+    frame_step INTEGER,
+    backend TEXT,
+    analyzed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS layers (
+    sequence TEXT NOT NULL REFERENCES sequences(path) ON DELETE CASCADE,
+    layer TEXT NOT NULL,
+    valid INTEGER NOT NULL,
+    first_frame INTEGER,
+    last_frame INTEGER,
+    PRIMARY KEY (sequence, layer)
+);
+CREATE INDEX IF NOT EXISTS layers_by_name ON layers (layer, valid);
+"""
+
+
+def default_index_path() -> str:
+    """
+    Get the index path from $CHANNEL_CHECKER_INDEX, or ~/.nuke/channel_checker_index.db.
+
+    Returns:
+        str: The index file path.
+    """
+    return os.environ.get(INDEX_ENV) or os.path.join(os.path.expanduser('~'), '.nuke', 'channel_checker_index.db')
+
+def _normalize(dir_path: str) -> str:
+    return os.path.abspath(dir_path).replace(os.sep, '/')
+
+def sequence_fingerprint(dir_path: str, files: list) -> str:
+    """
+    Fingerprint a sequence from the name, size and modification time of its files.
+
+    Only file metadata is read, so this stays cheap on network storage.
+
+    Args:
+        dir_path (str): The path to the directory containing the sequence.
+        files (list): The sequence file names.
+
+    Returns:
+        str: A hex digest that changes when any file is added, removed or rewritten.
+    """
+    digest = hashlib.sha1()
+    for file_name in sorted(files):
+        try:
+            stat = os.stat(os.path.join(dir_path, file_name))
+        except OSError:
+            continue
+        digest.update(f"{file_name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class LayerIndex(object):
+    """
+    A local SQLite index of which layers hold data in which sequences.
+
+    Each sequence row stores a fingerprint of its files so entries can be
+    checked and dropped once the render on disk changes.
+    """
+
+    def __init__(self, index_path=None):
+        self.index_path = index_path or default_index_path()
+        index_dir = os.path.dirname(self.index_path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        self.connection = sqlite3.connect(self.index_path)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def update(self, dir_path: str, files: list, result: tuple, frame_step=None, report=None, layer_ranges=None,
+               frame_numbers=None):
+        """
+        Store the analysis of a sequence, replacing any earlier entry for it.
+
+        Args:
+            dir_path (str): The analyzed directory.
+            files (list): The sequence file names.
+            result (tuple): The return value of analyze_sequence.
+            frame_step (int, optional): The frame step used for analysis. Defaults to None.
+            report (dict, optional): The run statistics from analyze_sequence. Defaults to None.
+            layer_ranges (dict, optional): layer -> (first frame, last frame) with data, from a
+                range analysis. Without it a valid layer only records the first sampled frame
+                with data and no last frame. Defaults to None.
+            frame_numbers (list, optional): The frame numbers of the files, for the sequence's
+                frame range. Defaults to None.
+        """
+        frame_numbers = frame_numbers or []
+        valid_layers, empty_layers, first_seen = result
+        layer_ranges = layer_ranges or {}
+        path = _normalize(dir_path)
+
+        with self.connection:
+            self.connection.execute('DELETE FROM sequences WHERE path = ?', (path,))
+            self.connection.execute(
+                'INSERT INTO sequences VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    path,
+                    sequence_fingerprint(dir_path, files),
+                    len(files),
+                    min(frame_numbers) if frame_numbers else None,
+                    max(frame_numbers) if frame_numbers else None,
+                    frame_step,
+                    (report or {}).get('backend'),
+                    time.time(),
+                ),
+            )
+            rows = []
+            for layer in valid_layers:
+                first_frame, last_frame = layer_ranges.get(layer, (first_seen.get(layer), None))
+                rows.append((path, layer, 1, first_frame, last_frame))
+            for layer in empty_layers:
+                rows.append((path, layer, 0, None, None))
+            self.connection.executemany('INSERT INTO layers VALUES (?, ?, ?, ?, ?)', rows)
+
+    def remove(self, dir_path: str):
+        with self.connection:
+            self.connection.execute('DELETE FROM sequences WHERE path = ?', (_normalize(dir_path),))
+
+    def is_stale(self, dir_path: str, ext='.exr') -> bool:
+        """
+        Check whether the files of an indexed sequence changed since it was analyzed.
+
+        Args:
+            dir_path (str): The sequence directory.
+            ext (str, optional): The sequence file extension. Defaults to '.exr'.
+
+        Returns:
+            bool: True if the sequence is not indexed, gone, or its fingerprint differs.
+        """
+        row = self.connection.execute(
+            'SELECT fingerprint FROM sequences WHERE path = ?', (_normalize(dir_path),)
+        ).fetchone()
+        if not row or not os.path.isdir(dir_path):
+            return True
+        files = [f for f in os.listdir(dir_path) if f.endswith(ext)]
+        return sequence_fingerprint(dir_path, files) != row[0]
+
+    def prune_stale(self, ext='.exr') -> list:
+        """
+        Drop every sequence whose files changed or disappeared.
+
+        Args:
+            ext (str, optional): The sequence file extension. Defaults to '.exr'.
+
+        Returns:
+            list: The removed sequence paths.
+        """
+        paths = [row[0] for row in self.connection.execute('SELECT path FROM sequences')]
+        return self.drop_stale(paths, ext)
+
+    def sequence_layers(self, dir_path: str) -> dict:
+        """
+        Get the indexed layers of one sequence.
+
+        Args:
+            dir_path (str): The sequence directory.
+
+        Returns:
+            dict: layer -> (valid, first frame, last frame).
+        """
+        rows = self.connection.execute(
+            'SELECT layer, valid, first_frame, last_frame FROM layers WHERE sequence = ?',
+            (_normalize(dir_path),),
+        )
+        return {layer: (bool(valid), first, last) for layer, valid, first, last in rows}
+
+    def drop_stale(self, paths: list, ext='.exr') -> list:
+        """
+        Re-check the fingerprints of some indexed sequences and drop the ones that changed.
+
+        Args:
+            paths (list): Indexed sequence paths.
+            ext (str, optional): The sequence file extension. Defaults to '.exr'.
+
+        Returns:
+            list: The removed sequence paths.
+        """
+        stale = [path for path in sorted(set(paths)) if self.is_stale(path, ext)]
+        if stale:
+            with self.connection:
+                self.connection.executemany('DELETE FROM sequences WHERE path = ?', [(p,) for p in stale])
+        return stale
+
+    def find_sequences(self, layer_pattern: str, valid=True, under=None, check_stale=True) -> list:
+        """
+        Find sequences that have a matching layer with (or without) data.
+
+        Args:
+            layer_pattern (str): A layer name or shell-style pattern, e.g. 'coat*'.
+            valid (bool, optional): Match valid layers if True, empty ones if False. Defaults to True.
+            under (str, optional): Only return sequences below this directory. Defaults to None.
+            check_stale (bool, optional): Re-check the matched sequences' files and drop the
+                ones that changed. Defaults to True.
+
+        Returns:
+            list: (sequence path, layer, first frame, last frame) tuples, sorted by path.
+                The last frame is None unless the sequence was analyzed with active ranges.
+        """
+        query = (
+            'SELECT sequence, layer, first_frame, last_frame FROM layers '
+            'WHERE layer GLOB ? AND valid = ?'
+        )
+        params = [layer_pattern, int(valid)]
+        if under:
+            query += ' AND sequence GLOB ?'
+            params.append(_normalize(under).rstrip('/') + '/*')
+        query += ' ORDER BY sequence, layer'
+        rows = self.connection.execute(query, params).fetchall()
+        if check_stale:
+            stale = set(self.drop_stale([row[0] for row in rows]))
+            rows = [row for row in rows if row[0] not in stale]
+        return rows
+
+    def summary(self, layer_pattern='*', check_stale=True) -> dict:
+        """
+        Count, per layer, how many indexed sequences have it valid and empty.
+
+        Args:
+            layer_pattern (str, optional): A shell-style layer pattern. Defaults to '*'.
+            check_stale (bool, optional): Re-check the counted sequences' files and drop the
+                ones that changed first. Defaults to True.
+
+        Returns:
+            dict: layer -> (valid count, empty count).
+        """
+        if check_stale:
+            self.drop_stale([row[0] for row in self.connection.execute(
+                'SELECT DISTINCT sequence FROM layers WHERE layer GLOB ?', (layer_pattern,)
+            )])
+        rows = self.connection.execute(
+            'SELECT layer, SUM(valid), SUM(1 - valid) FROM layers '
+            'WHERE layer GLOB ? GROUP BY layer ORDER BY layer',
+            (layer_pattern,),
+        )
+        return {layer: (valid_count, empty_count) for layer, valid_count, empty_count in rows}
+
+
+def _format_frames(first_frame, last_frame) -> str:
+    if first_frame is None:
+        return '-'
+    if last_frame is None:
+        # Without a range analysis only the first sampled frame with data is known.
+        return f"from {first_frame} (sampled)"
+    return f"{first_frame}-{last_frame}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the Channel Checker layer index.")
+    parser.add_argument("--index", default=default_index_path(), help="Index file path.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    find_parser = commands.add_parser("find", help="List sequences with a matching layer.")
+    find_parser.add_argument("layer", help="Layer name or pattern, e.g. 'emission*'.")
+    find_parser.add_argument("--empty", action="store_true", help="Match empty layers instead of valid ones.")
+    find_parser.add_argument("--under", help="Only sequences below this directory.")
+
+    summary_parser = commands.add_parser("summary", help="Valid/empty counts per layer.")
+    summary_parser.add_argument("layer", nargs="?", default="*", help="Layer name or pattern.")
+
+    commands.add_parser("prune", help="Drop every sequence whose files changed.")
+
+    args = parser.parse_args(argv)
+    with LayerIndex(args.index) as index:
+        if args.command == "find":
+            for sequence, layer, first_frame, last_frame in index.find_sequences(args.layer, not args.empty, args.under):
+                print(f"{sequence}\t{layer}\t{_format_frames(first_frame, last_frame)}")
+        elif args.command == "summary":
+            for layer, (valid_count, empty_count) in index.summary(args.layer).items():
+                print(f"{layer}\tvalid: {valid_count}\tempty: {empty_count}")
+        elif args.command == "prune":
+            for path in index.prune_stale():
+                print(f"Removed: {path}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -6,10 +6,24 @@ import sys
 import time
 import pprint
 import re
+import argparse
 try:
-    import nuke
+    from . import backends
+    from . import index
+    from . import dedup
+    from . import prefetch
 except ImportError:
-    pass
+    import backends
+    import index
+    import dedup
+    import prefetch
+
+# Number of sampled frames every candidate backend is timed on.
+CALIBRATION_FRAMES = 2
+
+# (compression, layout) -> backend names ranked fastest first, kept for the session.
+_calibration_cache = {}
+
 
 def extract_frame_number(file_name) -> int:
     """
@@ -26,174 +40,647 @@ def extract_frame_number(file_name) -> int:
         return int(match.group(1))
     return None
 
-def get_exr_channels(file_path: str) -> list:
+def list_sequence_files(dir_path: str, ext='.exr') -> list:
+    """
+    List the sequence files of a directory, sorted by name.
+
+    Args:
+        dir_path (str): The path to the directory containing the sequence.
+        ext (str, optional): The sequence file extension. Defaults to '.exr'.
+
+    Returns:
+        list: The file names.
+    """
+    return sorted([f for f in os.listdir(dir_path) if f.endswith(ext)])
+
+def get_exr_channels(file_path: str, backend=None) -> list:
     """
     Extract channels from an EXR file, excluding specific layers.
 
     Args:
         file_path (str): The path to the EXR file.
+        backend (str, optional): The backend name to use. Defaults to the first available one.
 
     Returns:
         list: A list of channel names excluding specified layers.
     """
     try:
-        exr_file = nuke.createNode("Read", inpanel=False)
-        exr_file['file'].fromUserText(file_path)
-        channels = exr_file.channels()
-        
-        # TODO: Add filtering options if needed
-        _filter = ['N.', 'albedo.', 'normal.']
-
-        filtered_channels = [
-            ch for ch in channels
-            if not any(ch.startswith(excluded) for excluded in _filter)
-        ]
-        nuke.delete(exr_file)
-        return list(filtered_channels)
+        candidates = [backends.get_backend(backend)] if backend else backends.available_backends()
+        for candidate in candidates:
+            try:
+                return candidate.get_channels(file_path)
+            except Exception as e:
+                print(f"[{candidate.name}] Error reading EXR file: {e}")
+        return []
     except Exception as e:
         print(f"Error reading EXR file: {e}")
         return []
 
-def validate_exr_channels(node: nuke.Node, frame_number: int, target_layers: list) -> tuple:
+def get_exr_layers(file_path: str, backend=None) -> list:
+    """
+    Extract the layer names of an EXR file, in channel order.
+
+    Args:
+        file_path (str): The path to the EXR file.
+        backend (str, optional): The backend name to use. Defaults to the first available one.
+
+    Returns:
+        list: A list of unique layer names.
+    """
+    layers = []
+    for ch in get_exr_channels(file_path, backend):
+        if '.' not in ch:
+            continue
+        layer = ch.split('.')[0]
+        if layer not in layers:
+            layers.append(layer)
+    return layers
+
+def _layout_key(header: dict) -> tuple:
+    if not header:
+        return None
+    return header['compression'], header['layout']
+
+def calibrate_backends(candidates: list, frames: list, target_layers: list) -> tuple:
+    """
+    Time every candidate backend on the first sampled frames and rank them.
+
+    Every calibration frame is read once before timing, so the first backend does not
+    pay for a cold network read that later ones get from the page cache.
+
+    Backends that fail on a calibration frame are dropped from the ranking, and so
+    are backends whose verdicts differ from the first candidate that succeeded. This
+    only covers the calibration frames; see the README for where the backends' tests differ.
+
+    Args:
+        candidates (list): AnalysisBackend instances to compare, in registration order.
+        frames (list): (frame path, frame number) tuples to calibrate on.
+        target_layers (list): List of target layers to validate.
+
+    Returns:
+        tuple: The ranked backends (fastest first), the total seconds per backend name,
+            and a dict of frame number -> (valid layers, empty layers) from the fastest backend.
+    """
+    for frame_path, _ in frames:
+        try:
+            prefetch.read_into_cache(frame_path)
+        except OSError as e:
+            print(f"Could not read {frame_path}: {e}")
+
+    timings = {}
+    results = {}
+    for backend in candidates:
+        elapsed = 0.0
+        backend_results = {}
+        try:
+            for frame_path, frame_number in frames:
+                frame_time, backend_results[frame_number] = backends.time_backend(
+                    backend, frame_path, frame_number, target_layers
+                )
+                elapsed += frame_time
+        except Exception as e:
+            print(f"[{backend.name}] Calibration failed: {e}")
+            continue
+        timings[backend.name] = elapsed
+        results[backend.name] = backend_results
+
+    reference = next((b.name for b in candidates if b.name in results), None)
+    for name in list(results):
+        if not _same_verdicts(results[name], results[reference]):
+            print(f"[{name}] Disagrees with {reference} on the calibration frames, not used.")
+            del timings[name]
+            del results[name]
+
+    ranked = sorted([b for b in candidates if b.name in timings], key=lambda b: timings[b.name])
+    frame_results = results[ranked[0].name] if ranked else {}
+    return ranked, timings, frame_results
+
+def _same_verdicts(results: dict, reference: dict) -> bool:
+    for frame_number, (valid_layers, empty_layers) in reference.items():
+        other_valid, other_empty = results[frame_number]
+        if set(other_valid) != set(valid_layers) or set(other_empty) != set(empty_layers):
+            return False
+    return True
+
+def select_backends(header: dict, frames: list, target_layers: list, backend=None, report=None) -> tuple:
+    """
+    Decide which backends to run a sequence with, fastest first.
+
+    A forced backend is tried first with the others as fallbacks. Otherwise the
+    ranking for the sequence's compression and layout is reused from earlier
+    sequences, or measured with calibrate_backends.
+
+    Args:
+        header (dict): The EXR header of the first frame, or None if it could not be read.
+        frames (list): (frame path, frame number) tuples available for calibration.
+        target_layers (list): List of target layers to validate.
+        backend (str, optional): Force this backend name. Defaults to None.
+        report (dict, optional): Receives the 'calibration' timings. Defaults to None.
+
+    Returns:
+        tuple: The ranked backends and a dict of frame number -> (valid layers, empty layers)
+            already computed during calibration.
+    """
+    candidates = backends.available_backends(header)
+    if backend:
+        forced = backends.get_backend(backend)
+        return [forced] + [b for b in candidates if b.name != forced.name], {}
+
+    key = _layout_key(header)
+    if key in _calibration_cache:
+        ranked_names = _calibration_cache[key]
+        return [b for name in ranked_names for b in candidates if b.name == name], {}
+
+    if len(candidates) < 2:
+        return candidates, {}
+
+    ranked, timings, frame_results = calibrate_backends(
+        candidates, frames[:CALIBRATION_FRAMES], target_layers
+    )
+    if report is not None:
+        report['calibration'] = timings
+    if ranked and key is not None:
+        _calibration_cache[key] = [b.name for b in ranked]
+    return ranked, frame_results
+
+def validate_frame(ranked: list, frame_path: str, frame_number: int, target_layers: list, report=None) -> tuple:
     """
-    Validate EXR channels using Shuffle and CurveTool nodes.
+    Validate a frame with the first backend in the ranking that succeeds.
 
     Args:
-        node (nuke.Node): The Nuke node to analyze.
+        ranked (list): AnalysisBackend instances, preferred first. Reordered in place on fallback.
+        frame_path (str): The path to the frame.
         frame_number (int): The frame number to evaluate.
         target_layers (list): List of target layers to validate.
+        report (dict, optional): Receives 'fallbacks' entries. Defaults to None.
 
     Returns:
         tuple: A tuple containing two lists - valid layers and empty layers.
     """
-    empty_layers = []
-    valid_layers = []
+    for backend in list(ranked):
+        try:
+            result = backend.validate_layers(frame_path, frame_number, target_layers)
+        except Exception as e:
+            print(f"[{backend.name}] Failed on {frame_path}: {e}")
+            if report is not None:
+                report.setdefault('fallbacks', []).append((frame_number, backend.name))
+            continue
+        # Later frames go straight to the backend that worked.
+        ranked.remove(backend)
+        ranked.insert(0, backend)
+        return result
+    raise RuntimeError(f"No analysis backend could read {frame_path}")
+
+def _prepare_sequence(dir_path: str, files: list, layers: list, backend: str) -> tuple:
+    """
+    List the frames of a sequence and read what every analysis needs up front.
 
-    shuffle = nuke.createNode('Shuffle', inpanel=False)
-    shuffle.setInput(0, node)
-    curve_tool = nuke.createNode('CurveTool', inpanel=False)
-    w, h = curve_tool.width(), curve_tool.height()
+    Args:
+        dir_path (str): The path to the directory containing EXR files.
+        files (list): The sequence file names, or None for every EXR in dir_path.
+        layers (list): The layers to test, or None for the layers of the first frame.
+        backend (str): The forced backend name, or None.
 
-    for layer in target_layers:
-        shuffle['in'].setValue(layer)
-        curve_tool['operation'].setValue('Max Luma Pixel')
-        curve_tool['ROI'].setValue((0, 0, w, h))
-        nuke.execute(curve_tool, frame_number, frame_number)
-        max_data = curve_tool['maxlumapixvalue'].value()
-        min_data = curve_tool['minlumapixvalue'].value()
-        max_val = max(max_data)
-        min_val = max(min_data)
+    Returns:
+        tuple: The (frame path, frame number) tuples, the layers to test and the first
+            frame's EXR header (None if unreadable), or None if there is nothing to analyze.
+    """
+    files = files if files is not None else list_sequence_files(dir_path)
+    frames = []
+    for file_name in files:
+        frame_path = os.path.join(dir_path, file_name).replace(os.sep, '/')
+        if not os.path.exists(frame_path):
+            print(f"File not found: {frame_path}")
+            continue
+
+        frame_number = extract_frame_number(file_name)
+        if frame_number is None:
+            print(f"Could not extract frame number from file name: {file_name}")
+            continue
+        frames.append((frame_path, frame_number))
+    if not frames:
+        print("No EXR files found in the directory.")
+        return None
+
+    initial_channels = layers if layers is not None else get_exr_layers(frames[0][0], backend)
+    if not initial_channels:
+        print("Failed to retrieve channels from the first frame.")
+        return None
+
+    print(f"Initial Channels: {initial_channels}")
+
+    try:
+        header = backends.read_exr_header(frames[0][0])
+    except Exception as e:
+        print(f"Could not read EXR header: {e}")
+        header = None
+    return frames, initial_channels, header
 
-        if max_val == 0 and min_val == 0:
-            empty_layers.append(layer)
-        else:
-            valid_layers.append(layer)
 
-    nuke.delete(curve_tool)
-    nuke.delete(shuffle)
+class _FrameEvaluator(object):
+    """
+    Validate frames for one analysis run, shared by analyze_sequence and analyze_active_ranges.
 
-    return valid_layers, empty_layers
+    Picks the backends, reads the sampled frames ahead, reuses verdicts of repeated
+    pixel data and fills the report when the run ends.
+    """
 
-def analyze_sequence(dir_path: str, frame_step=1) -> tuple:
+    def __init__(self, sampled_frames: list, header: dict, initial_channels: list, backend=None, report=None,
+                 skip_duplicates=True, prefetch_depth=prefetch.PREFETCH_DEPTH, prefetch_budget=prefetch.PREFETCH_BYTE_BUDGET):
+        self.report = report
+        self.verdicts = dedup.VerdictCache() if skip_duplicates else None
+        self.frames_analyzed = set()
+        self.prefetch_depth = prefetch_depth
+        self.prefetch_budget = prefetch_budget
+        self.prefetcher = None
+        self._prefetch_totals = {}
+        self.ranked, self.calibrated = select_backends(header, sampled_frames, initial_channels, backend, report)
+        if not self.ranked:
+            raise RuntimeError("No analysis backend is available for this sequence.")
+        print(f"Analysis backend: {self.ranked[0].name}")
+
+        # Read-ahead starts after calibration so it does not compete with the timed reads.
+        self.read_ahead(sampled_frames)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._close_prefetcher()
+        if self.report is not None:
+            self.report['backend'] = self.ranked[0].name
+            self.report['frames_analyzed'] = len(self.frames_analyzed)
+            self.report.update(self._prefetch_totals)
+            if self.verdicts is not None:
+                self.verdicts.update_report(self.report)
+
+    def read_ahead(self, frames: list):
+        """
+        Start reading ahead a new list of frames, replacing the previous one.
+
+        Args:
+            frames (list): (frame path, frame number) tuples, in the order they will be evaluated.
+        """
+        self._close_prefetcher()
+        self.prefetcher = prefetch.FramePrefetcher([path for path, _ in frames], self.prefetch_depth, self.prefetch_budget)
+        self.prefetcher.advance(0)
+
+    def _close_prefetcher(self):
+        if self.prefetcher is None:
+            return
+        self.prefetcher.close()
+        prefetcher_report = {}
+        self.prefetcher.update_report(prefetcher_report)
+        for key, value in prefetcher_report.items():
+            self._prefetch_totals[key] = self._prefetch_totals.get(key, 0) + value
+        self.prefetcher = None
+
+    def advance(self, position: int):
+        """
+        Tell the read-ahead which frame of the current read_ahead list is evaluated next.
+
+        Args:
+            position (int): Index of the frame in that list.
+        """
+        self.prefetcher.advance(position)
+
+    def evaluate(self, frame_path: str, frame_number: int, target_layers: list) -> tuple:
+        """
+        Validate layers on one frame, reusing calibration results and known verdicts.
+
+        Args:
+            frame_path (str): The path to the frame.
+            frame_number (int): The frame number to evaluate.
+            target_layers (list): List of target layers to validate.
+
+        Returns:
+            tuple: Valid layers, empty layers, and True if every verdict came from an earlier frame.
+        """
+        self.frames_analyzed.add(frame_number)
+        if frame_number in self.calibrated:
+            valid_channels, empty_channels = self.calibrated[frame_number]
+            if self.verdicts is not None:
+                # Keep calibration verdicts too, so later repeats of these frames are skipped.
+                try:
+                    verdict = {ch: True for ch in valid_channels}
+                    verdict.update((ch, False) for ch in empty_channels)
+                    self.verdicts.store(self.verdicts.fingerprint(frame_path), verdict)
+                except Exception as e:
+                    print(f"Could not fingerprint {frame_path}: {e}")
+            valid_channels = [ch for ch in valid_channels if ch in target_layers]
+            empty_channels = [ch for ch in empty_channels if ch in target_layers]
+            return valid_channels, empty_channels, False
+
+        fingerprint = None
+        known = {}
+        if self.verdicts is not None:
+            try:
+                fingerprint = self.verdicts.fingerprint(frame_path)
+                known = self.verdicts.lookup(fingerprint, target_layers)
+            except Exception as e:
+                print(f"Could not fingerprint {frame_path}: {e}")
+        missing = [ch for ch in target_layers if ch not in known]
+
+        valid_channels, empty_channels = [], []
+        if missing:
+            valid_channels, empty_channels = validate_frame(self.ranked, frame_path, frame_number, missing, self.report)
+        valid_channels = valid_channels + [ch for ch, valid in known.items() if valid]
+        empty_channels = empty_channels + [ch for ch, valid in known.items() if not valid]
+
+        if fingerprint is not None:
+            verdict = {ch: True for ch in valid_channels}
+            verdict.update((ch, False) for ch in empty_channels)
+            self.verdicts.store(fingerprint, verdict)
+        return valid_channels, empty_channels, not missing
+
+def analyze_sequence(dir_path: str, frame_step=1, files=None, layers=None, backend=None, report=None, skip_duplicates=True,
+                     prefetch_depth=prefetch.PREFETCH_DEPTH, prefetch_budget=prefetch.PREFETCH_BYTE_BUDGET) -> tuple:
     """
     Analyze an image sequence in a directory to identify valid and empty channels.
 
     Args:
         dir_path (str): The path to the directory containing EXR files.
         frame_step (int, optional): The frame step for analysis. Defaults to 1.
+        files (list, optional): The sequence file names. Defaults to every EXR in dir_path.
+        layers (list, optional): The layers to test. Defaults to the layers of the first frame.
+        backend (str, optional): Force this backend name instead of calibrating. Defaults to None.
+        report (dict, optional): Filled with run statistics such as the backend used. Defaults to None.
+        skip_duplicates (bool, optional): Reuse verdicts for frames and parts whose pixel data
+            was already evaluated. Defaults to True.
+        prefetch_depth (int, optional): Number of upcoming sampled frames read ahead in the
+            background, 0 to disable. Defaults to prefetch.PREFETCH_DEPTH.
+        prefetch_budget (int, optional): Maximum bytes read ahead of the current frame.
+            Defaults to prefetch.PREFETCH_BYTE_BUDGET.
 
     Returns:
         tuple: A tuple containing valid channels, empty channels, and the first seen frame for each channel.
     """
     print(f"Analyzing sequence in directory: {dir_path}\n")
-    files = sorted([f for f in os.listdir(dir_path) if f.endswith('.exr')])
-    if not files:
-        print("No EXR files found in the directory.")
-        return
-
-    first_frame_path = os.path.join(dir_path, files[0]).replace(os.sep, '/')
-    initial_channels = get_exr_channels(first_frame_path)
-    if not initial_channels:
-        print("Failed to retrieve channels from the first frame.")
+    prepared = _prepare_sequence(dir_path, files, layers, backend)
+    if not prepared:
         return
+    frames, initial_channels, header = prepared
 
-    print(f"Initial Channels: {initial_channels}")
-    
-    temp_channels = []
-    for ch in initial_channels:
-        if not ch.split('.')[0] in temp_channels:
-            temp_channels.append(ch.split('.')[0])
-    initial_channels = temp_channels
-
+    sampled_frames = frames[::frame_step]
     remaining_channels = initial_channels[:]
-    channel_status = {ch: True for ch in initial_channels}
     channel_first_seen = {}
-    
-    for i, file_name in enumerate(files):
-        if not i % frame_step == 0:
-            continue
+    with _FrameEvaluator(sampled_frames, header, initial_channels, backend, report, skip_duplicates,
+                         prefetch_depth, prefetch_budget) as evaluator:
+        for position, (frame_path, frame_number) in enumerate(sampled_frames):
+            evaluator.advance(position)
+            valid_channels, empty_channels, skipped = evaluator.evaluate(frame_path, frame_number, remaining_channels)
 
-        frame_path = os.path.join(dir_path, file_name).replace(os.sep, '/')
-        if not os.path.exists(frame_path):
-            print(f"File not found: {frame_path}")
-            continue
+            print(f"\n=== Frame {frame_number} Analysis{' (duplicate, skipped)' if skipped else ''} ===")
+            print(f"Valid Channels: {valid_channels}")
+            print(f"Empty Channels: {empty_channels}")
 
-        node = nuke.createNode("Read", f"file {{{frame_path}}}", inpanel=False)
-        frame_number = extract_frame_number(file_name)
-        if not frame_number:
-            print(f"Could not extract frame number from file name: {file_name}")
-            nuke.delete(node)
-            continue
+            for ch in valid_channels:
+                if ch not in channel_first_seen:
+                    channel_first_seen[ch] = frame_number
 
-        valid_channels, empty_channels = validate_exr_channels(node, frame_number, remaining_channels)
+            remaining_channels = [ch for ch in remaining_channels if ch not in valid_channels]
 
-        print(f"\n=== Frame {frame_number} Analysis ===")
-        print(f"Valid Channels: {valid_channels}")
-        print(f"Empty Channels: {empty_channels}")
+            if not remaining_channels:
+                print("All channels have been validated. Stopping further checks.")
+                break
 
-        for ch in valid_channels:
-            if ch not in channel_first_seen:
-                channel_first_seen[ch] = frame_number
+    valid_channels = [ch for ch in initial_channels if ch in channel_first_seen]
+    empty_channels = [ch for ch in initial_channels if ch not in channel_first_seen]
 
-        for ch in valid_channels:
-            channel_status[ch] = False
+    return valid_channels, empty_channels, channel_first_seen
 
-        remaining_channels = [ch for ch in remaining_channels if channel_status[ch]]
+def analyze_active_ranges(dir_path: str, frame_step=1, files=None, layers=None, backend=None, report=None, skip_duplicates=True,
+                          prefetch_depth=prefetch.PREFETCH_DEPTH, prefetch_budget=prefetch.PREFETCH_BYTE_BUDGET) -> tuple:
+    """
+    Find the frame intervals in which each layer holds data.
 
-        nuke.delete(node)
+    Every layer is tested on every frame_step-th frame and on the last frame. Where a
+    layer changes between two sampled frames, the frames in between are bisected to
+    find the exact boundary. A layer that appears and disappears again between two
+    sampled frames is not detected, so frame_step should be shorter than the
+    shortest expected gap.
 
-        if not remaining_channels:
-            print("All channels have been validated. Stopping further checks.")
-            break
+    Args:
+        dir_path (str): The path to the directory containing EXR files.
+        frame_step (int, optional): The frame step for the sampling pass. Defaults to 1.
+        files (list, optional): The sequence file names. Defaults to every EXR in dir_path.
+        layers (list, optional): The layers to test. Defaults to the layers of the first frame.
+        backend (str, optional): Force this backend name instead of calibrating. Defaults to None.
+        report (dict, optional): Filled with run statistics such as the backend used. Defaults to None.
+        skip_duplicates (bool, optional): Reuse verdicts for frames and parts whose pixel data
+            was already evaluated. Defaults to True.
+        prefetch_depth (int, optional): Number of upcoming sampled frames read ahead in the
+            background, 0 to disable. Defaults to prefetch.PREFETCH_DEPTH.
+        prefetch_budget (int, optional): Maximum bytes read ahead of the current frame.
+            Defaults to prefetch.PREFETCH_BYTE_BUDGET.
 
-    empty_channels = [ch for ch, is_empty in channel_status.items() if is_empty]
-    valid_channels = [ch for ch, is_empty in channel_status.items() if not is_empty]
+    Returns:
+        tuple: A tuple containing valid channels, empty channels, and a dict of
+            channel -> list of (first frame, last frame) intervals with data.
+    """
+    print(f"Analyzing active frame ranges in directory: {dir_path}\n")
+    prepared = _prepare_sequence(dir_path, files, layers, backend)
+    if not prepared:
+        return
+    frames, initial_channels, header = prepared
+
+    sampled = list(range(0, len(frames), frame_step))
+    if sampled[-1] != len(frames) - 1:
+        sampled.append(len(frames) - 1)
+
+    frame_verdicts = {}
+    sampled_frames = [frames[i] for i in sampled]
+    with _FrameEvaluator(sampled_frames, header, initial_channels, backend, report, skip_duplicates,
+                         prefetch_depth, prefetch_budget) as evaluator:
+
+        def evaluate(index, target_layers):
+            known = frame_verdicts.setdefault(index, {})
+            missing = [ch for ch in target_layers if ch not in known]
+            if missing:
+                valid_channels, empty_channels, _ = evaluator.evaluate(*frames[index], missing)
+                known.update((ch, True) for ch in valid_channels)
+                known.update((ch, False) for ch in empty_channels)
+
+        for position, index in enumerate(sampled):
+            evaluator.advance(position)
+            evaluate(index, initial_channels)
+
+        # Bisect every sampled gap where a layer switches on or off, all layers at once.
+        searches = []
+        for ch in initial_channels:
+            for lo, hi in zip(sampled, sampled[1:]):
+                if hi - lo > 1 and frame_verdicts[lo][ch] != frame_verdicts[hi][ch]:
+                    searches.append((ch, lo, hi))
+        while searches:
+            requests = {}
+            for ch, lo, hi in searches:
+                requests.setdefault((lo + hi) // 2, []).append(ch)
+            # Every midpoint of a round is known up front, so read them ahead too.
+            midpoints = sorted(requests)
+            evaluator.read_ahead([frames[mid] for mid in midpoints])
+            for position, mid in enumerate(midpoints):
+                evaluator.advance(position)
+                evaluate(mid, requests[mid])
+
+            next_searches = []
+            for ch, lo, hi in searches:
+                mid = (lo + hi) // 2
+                if frame_verdicts[mid][ch] == frame_verdicts[lo][ch]:
+                    lo = mid
+                else:
+                    hi = mid
+                if hi - lo > 1:
+                    next_searches.append((ch, lo, hi))
+            searches = next_searches
+
+    layer_ranges = {}
+    for ch in initial_channels:
+        intervals = []
+        start = end = None
+        for index in sorted(i for i in frame_verdicts if ch in frame_verdicts[i]):
+            if frame_verdicts[index][ch]:
+                if start is None:
+                    start = index
+                end = index
+            elif start is not None:
+                intervals.append((frames[start][1], frames[end][1]))
+                start = None
+        if start is not None:
+            intervals.append((frames[start][1], frames[end][1]))
+        if intervals:
+            layer_ranges[ch] = intervals
+        print(f"{ch}: {format_ranges(intervals) or 'empty'}")
+
+    valid_channels = [ch for ch in initial_channels if ch in layer_ranges]
+    empty_channels = [ch for ch in initial_channels if ch not in layer_ranges]
+    return valid_channels, empty_channels, layer_ranges
+
+def format_ranges(intervals: list) -> str:
+    """
+    Format frame intervals like '1040-1080, 1200'.
 
-    return valid_channels, empty_channels, channel_first_seen
+    Args:
+        intervals (list): (first frame, last frame) tuples.
 
-def main(dir_path: str):
-    start_time = time.time()
-    frame_step = 10
-    valid_channels, empty_channels, channel_first_seen = analyze_sequence(dir_path, frame_step)
-    print("\n=== Final Channel Analysis ===\n")
-    print(f"Valid Channels: {valid_channels}\n")
-    print(f"Empty Channels: {empty_channels}")
-    print(f"\nElapsed time: {time.time() - start_time:.2f} seconds\n")
-    
-    log_path = os.path.join(dir_path, "empty_channels.log")
+    Returns:
+        str: The formatted intervals.
+    """
+    return ', '.join(str(first) if first == last else f"{first}-{last}" for first, last in intervals)
+
+def write_log(log_path: str, dir_path: str, frame_step: int, elapsed: float, result: tuple, report=None, layer_ranges=None):
+    """
+    Write the analysis results to a log file.
+
+    Args:
+        log_path (str): The path of the log file.
+        dir_path (str): The analyzed directory.
+        frame_step (int): The frame step used for analysis.
+        elapsed (float): The analysis time in seconds.
+        result (tuple): The return value of analyze_sequence.
+        report (dict, optional): The run statistics from analyze_sequence. Defaults to None.
+        layer_ranges (dict, optional): The intervals from analyze_active_ranges. Defaults to None.
+    """
+    valid_channels, empty_channels, channel_first_seen = result
     with open(log_path, "w") as f:
         f.write("[Empty Channels Analysis]\n")
         f.write(f"  - Directory: {dir_path}\n")
         f.write(f"  - Frame Step: {frame_step}\n")
-        f.write(f"  - Elapsed Time: {time.time() - start_time:.2f} seconds\n\n")
+        f.write(f"  - Elapsed Time: {elapsed:.2f} seconds\n")
+        if report:
+            f.write(f"  - Backend: {report.get('backend')}\n")
+            f.write(f"  - Frames Analyzed: {report.get('frames_analyzed')}\n")
+            if report.get('calibration'):
+                f.write(f"  - Calibration: {report['calibration']}\n")
+            if report.get('fallbacks'):
+                f.write(f"  - Fallbacks: {report['fallbacks']}\n")
+            if 'frames_skipped' in report:
+                f.write(f"  - Duplicate Frames Skipped: {report['frames_skipped']}\n")
+                f.write(f"  - Duplicate Layers Skipped: {report['layers_skipped']}\n")
+                f.write(f"  - Bytes Skipped: {report['bytes_skipped']} of {report['bytes_hashed']} hashed\n")
+            if report.get('frames_prefetched') or report.get('prefetches_cancelled'):
+                f.write(f"  - Frames Prefetched: {report['frames_prefetched']} ({report['bytes_prefetched']} bytes)\n")
+                f.write(f"  - Prefetches Cancelled: {report['prefetches_cancelled']}\n")
+        f.write("\n")
         f.write(f"[Valid Channels]: {valid_channels}\n\n")
         f.write(f"[Empty Channels]: {empty_channels}\n\n")
         f.write("[Valid Channels Data]\n")
         f.write(pprint.pformat(channel_first_seen))
-            
+        if layer_ranges:
+            f.write("\n\n[Active Frame Ranges]\n")
+            for ch, intervals in layer_ranges.items():
+                f.write(f"  - {ch}: {format_ranges(intervals)}\n")
+
+def record_in_index(dir_path: str, files: list, result: tuple, frame_step=None, report=None, index_path=None, layer_ranges=None):
+    """
+    Add or refresh a sequence's analysis in the layer index.
+
+    Args:
+        dir_path (str): The analyzed directory.
+        files (list): The sequence file names.
+        result (tuple): The return value of analyze_sequence.
+        frame_step (int, optional): The frame step used for analysis. Defaults to None.
+        report (dict, optional): The run statistics from analyze_sequence. Defaults to None.
+        index_path (str, optional): The index file. Defaults to index.default_index_path().
+        layer_ranges (dict, optional): The intervals from analyze_active_ranges. Defaults to None.
+    """
+    first_last = {ch: (intervals[0][0], intervals[-1][1]) for ch, intervals in (layer_ranges or {}).items()}
+    frame_numbers = [n for n in (extract_frame_number(f) for f in files) if n is not None]
+    with index.LayerIndex(index_path) as layer_index:
+        layer_index.update(dir_path, files, result, frame_step, report, first_last, frame_numbers)
+
+def main(dir_path: str, frame_step=10, backend=None, index_path=None, skip_duplicates=True,
+         prefetch_depth=prefetch.PREFETCH_DEPTH, prefetch_budget=prefetch.PREFETCH_BYTE_BUDGET, active_ranges=False):
+    start_time = time.time()
+    report = {}
+    files = list_sequence_files(dir_path)
+    analyze = analyze_active_ranges if active_ranges else analyze_sequence
+    try:
+        result = analyze(
+            dir_path, frame_step, files=files, backend=backend, report=report, skip_duplicates=skip_duplicates,
+            prefetch_depth=prefetch_depth, prefetch_budget=prefetch_budget
+        )
+    except RuntimeError as e:
+        # e.g. a multi-part sequence outside Nuke, which the openexr backend cannot decode.
+        print(f"Analysis failed: {e}")
+        return
+    if not result:
+        return
+    layer_ranges = None
+    if active_ranges:
+        valid_channels, empty_channels, layer_ranges = result
+        result = valid_channels, empty_channels, {ch: intervals[0][0] for ch, intervals in layer_ranges.items()}
+    valid_channels, empty_channels, channel_first_seen = result
+    print("\n=== Final Channel Analysis ===\n")
+    print(f"Valid Channels: {valid_channels}\n")
+    print(f"Empty Channels: {empty_channels}")
+    if 'frames_skipped' in report:
+        print(f"Duplicate frames skipped: {report['frames_skipped']} ({report['bytes_skipped']} bytes)")
+    print(f"\nElapsed time: {time.time() - start_time:.2f} seconds\n")
+
+    log_path = os.path.join(dir_path, "empty_channels.log")
+    write_log(log_path, dir_path, frame_step, time.time() - start_time, result, report, layer_ranges)
+
     print(f"Log file saved: {log_path}")
-    
+
+    if index_path:
+        record_in_index(dir_path, files, result, frame_step, report, index_path, layer_ranges)
+        print(f"Layer index updated: {index_path}")
+
 
 if __name__ == "__main__":
-    directory_path = "/path/to/your/image_sequence"
-    main(directory_path)
+    parser = argparse.ArgumentParser(description="Find valid and empty layers of an EXR sequence.")
+    parser.add_argument("dir_path", help="Directory containing the EXR sequence.")
+    parser.add_argument("--frame-step", type=int, default=10, help="Analyze every Nth frame.")
+    parser.add_argument("--backend", choices=backends.backend_names(), help="Skip calibration and use this backend.")
+    parser.add_argument("--index", default=index.default_index_path(), help="Layer index to record the results in.")
+    parser.add_argument("--no-index", action="store_true", help="Do not record the results in the layer index.")
+    parser.add_argument("--no-dedup", action="store_true", help="Evaluate every sampled frame even if its pixels repeat.")
+    parser.add_argument("--prefetch", type=int, default=prefetch.PREFETCH_DEPTH, help="Sampled frames to read ahead, 0 to disable.")
+    parser.add_argument("--prefetch-budget", type=int, default=prefetch.PREFETCH_BYTE_BUDGET // 1024 ** 2,
+                        help="Maximum megabytes read ahead of the current frame.")
+    parser.add_argument("--ranges", action="store_true", help="Find each layer's active frame ranges.")
+    args = parser.parse_args(sys.argv[1:])
+    main(
+        args.dir_path, args.frame_step, args.backend, None if args.no_index else args.index, not args.no_dedup,
+        args.prefetch, args.prefetch_budget * 1024 ** 2, args.ranges
+    )
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+
+import fnmatch
+from collections import OrderedDict
+
+# (group name, layer patterns, EXR compression), first match wins.
+# Each group is written by its own Write node, since an EXR has one compression.
+# Unless outputs are split, every group goes to one Write, see merge_groups.
+COMPRESSION_POLICY = [
+    ('data', ['depth', 'Z', 'P', 'Pref', 'N', 'normal*', 'albedo*', 'motion*', 'velocity*',
+              'forward', 'backward', 'uv', 'crypto*', 'id*', 'mask*'], 'ZIP'),
+    ('beauty', ['*'], 'DWAA'),
+]
+
+# Compression of a Write node that was left at Nuke's default.
+BASELINE_COMPRESSION = 'ZIPS'
+
+LOSSLESS_COMPRESSION = ['NONE', 'RLE', 'ZIPS', 'ZIP', 'PIZ']
+
+# Nuke Write exr 'compression' menu entries, matched exactly or else by prefix.
+NUKE_EXR_COMPRESSION = {
+    'NONE': 'none',
+    'RLE': 'RLE',
+    'ZIPS': 'Zip (1 scanline)',
+    'ZIP': 'Zip (16 scanlines)',
+    'PIZ': 'PIZ',
+    'PXR24': 'PXR24',
+    'B44': 'B44',
+    'B44A': 'B44A',
+    'DWAA': 'DWAA',
+    'DWAB': 'DWAB',
+}
+
+# Rough compressed / raw size of half float render layers, for size estimates only.
+ESTIMATED_RATIO = {
+    'NONE': 1.0,
+    'RLE': 0.8,
+    'ZIPS': 0.55,
+    'ZIP': 0.5,
+    'PIZ': 0.45,
+    'PXR24': 0.35,
+    'B44': 0.33,
+    'B44A': 0.3,
+    'DWAA': 0.15,
+    'DWAB': 0.15,
+}
+
+# Bytes per sample written by a Write node with the default 16 bit half datatype.
+OUTPUT_SAMPLE_BYTES = 2
+
+
+def layer_group(layer: str, policy=None) -> tuple:
+    """
+    Find the compression group of a layer.
+
+    Args:
+        layer (str): The layer name.
+        policy (list, optional): Rules like COMPRESSION_POLICY. Defaults to COMPRESSION_POLICY.
+
+    Returns:
+        tuple: The group name and its EXR compression.
+    """
+    for group, patterns, compression in policy or COMPRESSION_POLICY:
+        if any(fnmatch.fnmatchcase(layer, pattern) for pattern in patterns):
+            return group, compression
+    return 'default', BASELINE_COMPRESSION
+
+def group_layers(layers: list, denoised_layers=None, policy=None) -> OrderedDict:
+    """
+    Split layers into compression groups. Denoised layers follow their source layer.
+
+    Args:
+        layers (list): The source layers to write.
+        denoised_layers (dict, optional): source layer -> denoised layer. Defaults to None.
+        policy (list, optional): Rules like COMPRESSION_POLICY. Defaults to COMPRESSION_POLICY.
+
+    Returns:
+        OrderedDict: group -> (compression, layers), groups in policy order.
+    """
+    denoised_layers = denoised_layers or {}
+    groups = OrderedDict()
+    for group, _, compression in policy or COMPRESSION_POLICY:
+        groups[group] = (compression, [])
+    for layer in layers:
+        group, compression = layer_group(layer, policy)
+        groups.setdefault(group, (compression, []))[1].append(layer)
+        if layer in denoised_layers:
+            groups[group][1].append(denoised_layers[layer])
+    return OrderedDict((group, value) for group, value in groups.items() if value[1])
+
+def merge_groups(groups: OrderedDict) -> OrderedDict:
+    """
+    Merge every group into one 'all' group so all layers are written to one file.
+
+    If the groups use different compressions, the first lossless one is kept so
+    data passes are never written lossy.
+
+    Args:
+        groups (OrderedDict): The result of group_layers.
+
+    Returns:
+        OrderedDict: 'all' -> (compression, layers), or an empty dict.
+    """
+    if not groups:
+        return OrderedDict()
+    compressions = [compression for compression, _ in groups.values()]
+    compression = compressions[0]
+    if len(set(compressions)) > 1:
+        compression = next((c for c in compressions if c in LOSSLESS_COMPRESSION), compression)
+    layers = [layer for _, kept_layers in groups.values() for layer in kept_layers]
+    return OrderedDict([('all', (compression, layers))])
+
+def nuke_compression(knob_values: list, compression: str) -> str:
+    """
+    Find the Write node menu entry for an EXR compression.
+
+    Args:
+        knob_values (list): The entries of the Write 'compression' knob.
+        compression (str): The EXR compression, e.g. 'DWAA'.
+
+    Returns:
+        str: The matching menu entry, or None if the Nuke version has none.
+    """
+    label = NUKE_EXR_COMPRESSION.get(compression, compression).lower()
+    for value in knob_values:
+        if value.lower() == label:
+            return value
+    for value in knob_values:
+        if value.lower().startswith(label):
+            return value
+    return None
+
+def estimate_output_size(layer_channels: dict, baseline_layers: list, groups: OrderedDict, pixel_count: int, frame_count=1) -> dict:
+    """
+    Estimate the written size before and after limiting the Write to the kept layers.
+
+    The saving from removed layers is counted on uncompressed data, so it does not
+    depend on ESTIMATED_RATIO. The compressed sizes are rough and reported separately.
+
+    Args:
+        layer_channels (dict): layer -> number of channels, for every layer in the stream.
+        baseline_layers (list): The layers a Write with channels 'all' would output.
+        groups (OrderedDict): The result of group_layers for the kept layers.
+        pixel_count (int): Pixels per frame.
+        frame_count (int, optional): Frames in the sequence. Defaults to 1.
+
+    Returns:
+        dict: Uncompressed 'before' and 'after' bytes, the 'removed' bytes and their 'ratio'
+            of 'before', and the rough compressed size of the kept layers at BASELINE_COMPRESSION
+            ('compressed_baseline') and at the group compressions ('compressed').
+    """
+    frame_bytes = pixel_count * OUTPUT_SAMPLE_BYTES * frame_count
+
+    before = sum(layer_channels.get(layer, 0) for layer in baseline_layers) * frame_bytes
+    after = 0
+    compressed = 0.0
+    for compression, layers in groups.values():
+        layer_bytes = sum(layer_channels.get(layer, 0) for layer in layers) * frame_bytes
+        after += layer_bytes
+        compressed += layer_bytes * ESTIMATED_RATIO.get(compression, 1.0)
+
+    return {
+        'before': before,
+        'after': after,
+        'removed': before - after,
+        'ratio': (before - after) / before if before else 0.0,
+        'compressed_baseline': int(after * ESTIMATED_RATIO[BASELINE_COMPRESSION]),
+        'compressed': int(compressed),
+    }
+
+def format_size(size: float) -> str:
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} TB"
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of upcoming sampled frames read ahead of the one being evaluated.
+PREFETCH_DEPTH = 4
+
+# Upper limit for bytes read ahead but not yet evaluated.
+PREFETCH_BYTE_BUDGET = 2 * 1024 ** 3
+
+PREFETCH_WORKERS = 2
+
+READ_BLOCK_SIZE = 4 * 1024 ** 2
+
+
+def read_into_cache(file_path: str) -> int:
+    """
+    Read a whole file once so later opens are served from the OS page cache.
+
+    Args:
+        file_path (str): The file to read.
+
+    Returns:
+        int: The number of bytes read.
+    """
+    bytes_read = 0
+    with open(file_path, 'rb', buffering=0) as f:
+        buffer = bytearray(READ_BLOCK_SIZE)
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            bytes_read += n
+    return bytes_read
+
+
+class FramePrefetcher(object):
+    """
+    Read upcoming frames on background threads so they are in the OS page cache
+    by the time a backend opens them.
+
+    Backends open frames by path, so the data is not kept in memory; reading it
+    once is enough for the next open to be served from the cache instead of the
+    network. Frames that fall behind the current position, or are still pending
+    when the prefetcher is closed, are cancelled.
+    """
+
+    def __init__(self, frame_paths: list, depth=PREFETCH_DEPTH, byte_budget=PREFETCH_BYTE_BUDGET, workers=PREFETCH_WORKERS):
+        self.frame_paths = frame_paths
+        self.depth = depth
+        self.byte_budget = byte_budget
+        self.position = 0
+        self.closed = False
+
+        self.frames_prefetched = 0
+        self.bytes_prefetched = 0
+        self.frames_cancelled = 0
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._sizes = {}
+        self._reserved = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cc_prefetch') if depth > 0 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def advance(self, position: int):
+        """
+        Mark the frame at position as being evaluated and schedule the ones after it.
+
+        Args:
+            position (int): Index in frame_paths of the frame about to be evaluated.
+        """
+        if self._executor is None or self.closed:
+            return
+        with self._lock:
+            self.position = position
+            for index in [i for i in self._sizes if i <= position]:
+                self._release(index)
+
+            for index in range(position + 1, min(position + 1 + self.depth, len(self.frame_paths))):
+                if index in self._sizes:
+                    continue
+                try:
+                    size = os.path.getsize(self.frame_paths[index])
+                except OSError:
+                    continue
+                if self._reserved + size > self.byte_budget:
+                    break
+                self._sizes[index] = size
+                self._reserved += size
+                self._pending[index] = self._executor.submit(self._read, index)
+
+    def _release(self, index: int, cancelled=False):
+        future = self._pending.pop(index, None)
+        if future is not None and not future.done():
+            future.cancel()
+            if cancelled:
+                self.frames_cancelled += 1
+        self._reserved -= self._sizes.pop(index)
+
+    def _read(self, index: int):
+        bytes_read = 0
+        with open(self.frame_paths[index], 'rb', buffering=0) as f:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            buffer = bytearray(READ_BLOCK_SIZE)
+            while True:
+                # Stop once the frame is no longer needed or already being evaluated.
+                if self.closed or index <= self.position:
+                    return
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                bytes_read += n
+        with self._lock:
+            self.frames_prefetched += 1
+            self.bytes_prefetched += bytes_read
+
+    def close(self):
+        """
+        Cancel every pending prefetch and stop the worker threads.
+        """
+        if self._executor is None or self.closed:
+            return
+        self.closed = True
+        with self._lock:
+            for index in list(self._sizes):
+                self._release(index, cancelled=True)
+        self._executor.shutdown(wait=True)
+
+    def update_report(self, report: dict):
+        report['frames_prefetched'] = self.frames_prefetched
+        report['bytes_prefetched'] = self.bytes_prefetched
+        report['prefetches_cancelled'] = self.frames_cancelled